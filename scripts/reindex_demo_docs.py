@@ -1,6 +1,10 @@
-from ragbench.store.qdrant_store import QdrantStore
+from ragbench.pipeline.simple_rag import build_store
 from ragbench.embed.providers import OpenAIEmbeddingProvider
 from ragbench.embed.local_provider import LocalSTEmbeddingProvider
+from ragbench.embed.cache import CachedEmbeddingProvider
+from ragbench.store.bm25 import BM25Index
+
+STORE_KIND = "qdrant"  # or "numpy" for the in-process store under data/vectors
 
 DOCS = [
     "Helm templates are rendered using values from values.yaml and the Go template language.",
@@ -10,21 +14,26 @@ DOCS = [
 ]
 
 def build_collection(collection: str, vectors, payloads, dim: int):
-    store = QdrantStore(collection_name=collection, vector_size=dim)
+    store = build_store(STORE_KIND, collection, dim)
     store.recreate_collection()  # implement this if you don’t have it; else delete+create manually
     store.upsert(vectors, payloads)
+    store.flush()
+    sparse = BM25Index(collection)
+    sparse.recreate()
+    sparse.add([p["text"] for p in payloads], payloads)
+    sparse.save()
     print(f"Built: {collection} (n={len(payloads)})")
 
 def main():
     payloads = [{"text": t, "source": "demo"} for t in DOCS]
 
     # A) OpenAI text-embedding-3-large
-    oai = OpenAIEmbeddingProvider(model="text-embedding-3-large")
+    oai = CachedEmbeddingProvider(OpenAIEmbeddingProvider(model="text-embedding-3-large"))
     vecs_oai = oai.embed_documents(DOCS)
     build_collection("demo_k8s_helm_te3l", vecs_oai, payloads, oai.dim)
 
     # B) Local bge-small
-    local = LocalSTEmbeddingProvider("BAAI/bge-small-en-v1.5")
+    local = CachedEmbeddingProvider(LocalSTEmbeddingProvider("BAAI/bge-small-en-v1.5"))
     vecs_local = local.embed_documents(DOCS)
     build_collection("demo_k8s_helm_bge_small", vecs_local, payloads, local.dim)
 
@@ -1,8 +1,20 @@
-import json
+import argparse
 import glob
-from ragbench.store.qdrant_store import QdrantStore
+from ragbench.pipeline.simple_rag import build_store
+from ragbench.store.qdrant_store import QdrantOptions
 from ragbench.embed.providers import OpenAIEmbeddingProvider
 from ragbench.embed.local_provider import LocalSTEmbeddingProvider
+from ragbench.embed.cache import CachedEmbeddingProvider
+from ragbench.ingest.pipeline import IngestPipeline
+from ragbench.ingest.sync import sync_corpus, build_sparse_index
+from ragbench.store.bm25 import BM25Index
+
+STORE_KIND = "qdrant"  # or "numpy" for the in-process store under data/vectors
+# parallel non-blocking upload: each BATCH_SIZE ingest batch goes out as upload_batch_size chunks over
+# upload_parallel workers, waited for at checkpoints; set hnsw_m / hnsw_ef_construct / quantization here to tune the index
+QDRANT_OPTIONS = QdrantOptions(prefer_grpc=True, upload_parallel=4, upload_batch_size=64)
+BATCH_SIZE = 256
+SPARSE_INDEX = True  # BM25 postings under data/sparse, for retrieval_mode="hybrid"
 
 def load_latest_augmented():
     files = sorted(glob.glob("data/corpus_augmented_*.jsonl"))
@@ -10,38 +22,58 @@ def load_latest_augmented():
         raise FileNotFoundError("No augmented corpus found. Run scripts/augment_corpus.py first.")
     return files[-1]
 
-def load_jsonl(path):
-    texts = []
-    payloads = []
-    with open(path, "r") as f:
-        for line in f:
-            if line.strip():
-                row = json.loads(line)
-                texts.append(row["text"])
-                payloads.append({"text": row["text"], "source": row.get("source", "unknown")})
-    return texts, payloads
-
-def build_collection(collection: str, vectors, payloads, dim: int):
-    store = QdrantStore(collection_name=collection, vector_size=dim)
-    store.recreate_collection()
-    store.upsert(vectors, payloads, batch_size=128)
-    print(f"Built: {collection} (n={len(payloads)}) dim={dim}")
+def build_collection(collection: str, embedder, path: str, fresh: bool, sync: bool):
+    store = build_store(STORE_KIND, collection, embedder.dim, QDRANT_OPTIONS)
+    sparse = BM25Index(collection) if SPARSE_INDEX else None
+
+    if sync and not fresh:
+        store.create_collection()
+        if sparse is not None and not sparse.exists():
+            # no lexical index yet: build it from the whole corpus, the sync then only touches vectors
+            build_sparse_index(path, sparse)
+            sparse = None
+        report = sync_corpus(path, embedder, store, batch_size=BATCH_SIZE, sparse_index=sparse)
+        print(f"Synced: {collection} dim={embedder.dim}")
+        print("Sync:", report)
+        return
+
+    ingest = IngestPipeline(embedder, store, batch_size=BATCH_SIZE, sparse_index=sparse)
+
+    # keep the partially built collection only for an unfinished checkpoint of this (unchanged) corpus
+    if fresh or not ingest.can_resume(path):
+        store.recreate_collection()
+        if sparse is not None:
+            sparse.recreate()
+        fresh = True
+
+    report = ingest.run(path, resume=not fresh)
+    print(f"Built: {collection} (n={report['total_docs']}) dim={embedder.dim}")
+    print("Ingest:", report)
 
 def main():
-    path = load_latest_augmented()
-    texts, payloads = load_jsonl(path)
+    parser = argparse.ArgumentParser(description="Stream a JSONL corpus into the demo collections")
+    parser.add_argument("--corpus", help="JSONL corpus (default: latest data/corpus_augmented_*.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="ignore checkpoints and rebuild from scratch")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="incremental: embed/upsert only new or changed docs and delete removed ones",
+    )
+    args = parser.parse_args()
+
+    path = args.corpus or load_latest_augmented()
 
     # OpenAI large
-    oai = OpenAIEmbeddingProvider(model="text-embedding-3-large")
-    vecs_oai = oai.embed_texts(texts)
-    build_collection("demo_k8s_helm_te3l", vecs_oai, payloads, oai.dim)
+    oai = CachedEmbeddingProvider(OpenAIEmbeddingProvider(model="text-embedding-3-large"))
+    build_collection("demo_k8s_helm_te3l", oai, path, args.fresh, args.sync)
+    print("Embedding cache:", oai.stats())
 
     # Local bge-small
-    local = LocalSTEmbeddingProvider("BAAI/bge-small-en-v1.5")
-    vecs_local = local.embed_documents(texts)
-    build_collection("demo_k8s_helm_bge_small", vecs_local, payloads, local.dim)
+    local = CachedEmbeddingProvider(LocalSTEmbeddingProvider("BAAI/bge-small-en-v1.5"))
+    build_collection("demo_k8s_helm_bge_small", local, path, args.fresh, args.sync)
+    print("Embedding cache:", local.stats())
 
     print("Indexed from:", path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
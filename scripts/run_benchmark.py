@@ -1,17 +1,30 @@
+import argparse
 import json
 import os
+from dataclasses import asdict
 from statistics import mean
 from datetime import datetime
 
 from ragbench.bench.schema import BenchItem
-from ragbench.pipeline.simple_rag import run_rag
-from ragbench.generation.answer import generate_answer
-from ragbench.eval.judge import judge_faithfulness
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.bench.runner import answer_and_judge_all
+from ragbench.bench.checkpoint import RunCheckpoint
 from ragbench.eval.refusal import is_refusal
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.rerank.adaptive import RerankGate, simulate_gate, gate_summary
+from ragbench.utils.tracing import TRACER, latency_columns
+from ragbench.utils.results_store import ResultsStore, retrieval_columns, run_record_from_retrieval
 
 COLLECTION = "demo_k8s_helm"  # uses your existing indexed demo collection
 ANSWER_MODEL = "gpt-4.1-mini"
 JUDGE_MODEL = "gpt-4.1-mini"
+CONCURRENCY = 8  # LLM calls in flight
+CHECKPOINT_EVERY = 256  # items retrieved per batch; each item is journaled as soon as it is judged
+# replayed over the always-rerank retrievals to report what adaptive reranking would change. Off by
+# default: every item whose context changes is answered and judged again (LLM cache misses, paid calls).
+# --rerank-gate MARGIN enables a margin gate for one run
+RERANK_GATE = None
 
 def load_jsonl(path: str):
     with open(path, "r") as f:
@@ -20,13 +33,48 @@ def load_jsonl(path: str):
             if line:
                 yield json.loads(line)
 
+def answer_success_rate_of(items, evaluations) -> float:
+    flags = [
+        (not is_refusal(answer)) and bool(verdict.get("faithful", False))
+        for item, (answer, _, verdict, _) in zip(items, evaluations)
+        if item.gold_answer is not None
+    ]
+    return mean(flags) if flags else 0
+
+def item_record(item: BenchItem, retr, evaluation):
+    answer, ans_usage, verdict, judge_usage = evaluation
+    return {
+        "id": item.id,
+        "question": item.question,
+        "gold_answer": item.gold_answer,
+        "answer": answer,
+        "retrieval": retr,
+        "judge": verdict,
+        "usage": {
+            "answer": ans_usage,
+            "judge": judge_usage,
+        },
+    }
+
 def main():
+    parser = argparse.ArgumentParser(description="Retrieval + answer + judge benchmark")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue a crashed run, skipping finished items")
+    parser.add_argument(
+        "--rerank-gate",
+        type=float,
+        metavar="MARGIN",
+        help="also replay a margin rerank gate (e.g. 0.05) and re-answer the items it changes; extra LLM calls",
+    )
+    args = parser.parse_args()
+    rerank_gate = RerankGate(mode="margin", threshold=args.rerank_gate) if args.rerank_gate is not None else RERANK_GATE
+
     os.makedirs("results", exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     bench_path = "benchmarks/sample.jsonl"
-    out_jsonl = f"results/bench_runs_{ts}.jsonl"
     out_csv = f"results/bench_summary_{ts}.csv"
+    out_traces = f"results/traces_{ts}.otlp.json"
+    TRACER.reset()
 
     rows = []
     faithful_flags = []
@@ -37,69 +85,96 @@ def main():
     hallucination_flags = []
     correct_refusal_flags = []
 
-    with open(out_jsonl, "w") as fout:
-        for raw in load_jsonl(bench_path):
-            item = BenchItem(**raw)
-
-            retr = run_rag(
-                question=item.question,
-                collection=COLLECTION,
-                dense_top_k=10,
-                use_rerank=True,
-                rerank_top_n=3,
-            )
-
-            answer, ans_usage = generate_answer(
-                question=item.question,
-                context_chunks=retr["context_chunks"],
-                model=ANSWER_MODEL,
+    config = RagConfig(
+        collection=COLLECTION,
+        dense_top_k=10,
+        use_rerank=True,
+        rerank_top_n=3,
+        embed_cache_dir=DEFAULT_CACHE_DIR,
+    )
+    run_config = {"rag": asdict(config), "answer_model": ANSWER_MODEL, "judge_model": JUDGE_MODEL, "bench": bench_path}
+    items = [BenchItem(**raw) for raw in load_jsonl(bench_path)]
+
+    # finished items are journaled to results/runs/<run_id>; a crash loses at most the items in flight
+    if args.resume:
+        ckpt = RunCheckpoint.resume(args.resume, run_config, [item.id for item in items])
+    else:
+        ckpt = RunCheckpoint.create(ResultsStore.new_run_id("bench"), run_config, [item.id for item in items])
+    run_id = ckpt.run_id
+    pending = [item for item in items if item.id not in ckpt.records]
+    print(f"Run {run_id}: {ckpt.progress()} items done, {len(pending)} to go")
+
+    llm_cache = LLMCache()
+    if pending:
+        pipeline = RagPipeline(config)
+        for start in range(0, len(pending), CHECKPOINT_EVERY):
+            chunk = pending[start:start + CHECKPOINT_EVERY]
+            retrievals = pipeline.run_batch([item.question for item in chunk])
+            answer_and_judge_all(
+                chunk,
+                retrievals,
+                answer_model=ANSWER_MODEL,
+                judge_model=JUDGE_MODEL,
+                concurrency=CONCURRENCY,
+                cache=llm_cache,
+                on_result=lambda i, ev, chunk=chunk, retrievals=retrievals: ckpt.append(
+                    chunk[i].id, item_record(chunk[i], retrievals[i], ev)
+                ),
             )
-
-            verdict, judge_usage = judge_faithfulness(
-                question=item.question,
-                answer=answer,
-                context_chunks=retr["context_chunks"],
-                model=JUDGE_MODEL,
-            )
-
-            total_ms = retr["timings_ms"]["total_retrieval"]  # generation/judge latency not included yet
-            faithful = bool(verdict.get("faithful", False))
-
-            is_answerable = item.gold_answer is not None
-            refused = is_refusal(answer)
-
-            if is_answerable:
-                false_refusal = refused
-                answer_success = (not refused) and faithful
-            else:
-                hallucination = not refused
-                correct_refusal = refused
-
-            faithful_flags.append(1 if faithful else 0)
-            total_latency.append(total_ms)
-
-            if is_answerable:
-                answer_success_flags.append(1 if answer_success else 0)
-                false_refusal_flags.append(1 if false_refusal else 0)
-            else:
-                hallucination_flags.append(1 if hallucination else 0)
-                correct_refusal_flags.append(1 if correct_refusal else 0)
-
-            record = {
-                "id": item.id,
-                "question": item.question,
-                "gold_answer": item.gold_answer,
-                "answer": answer,
-                "retrieval": retr,
-                "judge": verdict,
-                "usage": {
-                    "answer": ans_usage,
-                    "judge": judge_usage,
-                },
-            }
-            fout.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-            rows.append((item.id, faithful, verdict.get("confidence", ""), verdict.get("rationale", ""), total_ms))
+            print(f"[checkpoint] {ckpt.progress()} items done")
+
+    # everything below is aggregated from the journal, so a resumed run reports on all items
+    records = [ckpt.records[item.id] for item in items]
+    retrievals = [r["retrieval"] for r in records]
+    evaluations = [(r["answer"], r["usage"]["answer"], r["judge"], r["usage"]["judge"]) for r in records]
+
+    store_records, evals = [], []
+    for item, retr, (answer, ans_usage, verdict, judge_usage) in zip(items, retrievals, evaluations):
+        total_ms = retr["timings_ms"]["total_retrieval"]  # generation/judge: per-stage percentiles below
+        faithful = bool(verdict.get("faithful", False))
+
+        is_answerable = item.gold_answer is not None
+        refused = is_refusal(answer)
+
+        if is_answerable:
+            false_refusal = refused
+            answer_success = (not refused) and faithful
+        else:
+            hallucination = not refused
+            correct_refusal = refused
+
+        faithful_flags.append(1 if faithful else 0)
+        total_latency.append(total_ms)
+
+        if is_answerable:
+            answer_success_flags.append(1 if answer_success else 0)
+            false_refusal_flags.append(1 if false_refusal else 0)
+        else:
+            hallucination_flags.append(1 if hallucination else 0)
+            correct_refusal_flags.append(1 if correct_refusal else 0)
+
+        store_records.append(run_record_from_retrieval(retr))
+        evals.append({
+            "item_id": item.id,
+            "gold_answer": item.gold_answer,
+            "answer": answer,
+            "faithful": faithful,
+            "refused": refused,
+            "judge": verdict,
+            "answer_tokens": (ans_usage or {}).get("total_tokens"),
+            "judge_tokens": (judge_usage or {}).get("total_tokens"),
+            **retrieval_columns(retr),
+        })
+
+        rows.append((item.id, faithful, verdict.get("confidence", ""), verdict.get("rationale", ""), total_ms))
+
+    # per-item records go to the columnar results store (results/store) once, when the run is complete.
+    # "storing" is journaled first: a crash mid-write leaves it set, and the retry replaces the run's parts
+    store = ResultsStore()
+    if ckpt.manifest["status"] != "stored":
+        ckpt.set_status("storing")
+        store.write_run(run_id, store_records, evals, config=run_config, script="run_benchmark")
+        ckpt.set_status("stored")
 
     answer_success_rate = mean(answer_success_flags) if answer_success_flags else 0
     false_refusal_rate = mean(false_refusal_flags) if false_refusal_flags else 0
@@ -122,9 +197,42 @@ def main():
         f.write("\n")
         f.write(f"overall_faithfulness_rate,{mean(faithful_flags):.3f}\n")
         f.write(f"avg_retrieval_ms,{mean(total_latency):.1f}\n")
-
-    print(f"Saved runs: {out_jsonl}")
+        # p50/p90/p99/max per stage (embed_query, retrieve, rerank, generate, judge, retry).
+        # Spans only exist for items processed in this session, so say so for a resumed run
+        f.write(f"latency_items,{len(pending)}/{len(items)}\n")
+        stage_latency = latency_columns(TRACER.spans)
+        for k, v in stage_latency.items():
+            f.write(f"{k},{v:.3f}\n")
+
+    if rerank_gate is not None:
+        # identical contexts hit the LLM cache, so only queries whose context changed cost a call
+        gated = simulate_gate(retrievals, rerank_gate)
+        gated_evaluations = answer_and_judge_all(
+            items,
+            gated,
+            answer_model=ANSWER_MODEL,
+            judge_model=JUDGE_MODEL,
+            concurrency=CONCURRENCY,
+            cache=llm_cache,
+        )
+        gate_row = gate_summary(gated)
+        gate_row["answer_success_rate"] = answer_success_rate_of(items, gated_evaluations)
+        gate_row["answer_success_delta"] = gate_row["answer_success_rate"] - answer_success_rate
+        print(
+            f"Adaptive rerank ({rerank_gate.mode}>={rerank_gate.threshold}): "
+            f"skip rate {gate_row['skip_rate']:.3f}, "
+            f"answer success {gate_row['answer_success_rate']:.3f} ({gate_row['answer_success_delta']:+.3f}), "
+            f"~{gate_row['avg_rerank_ms_saved']:.1f} ms/query saved"
+        )
+        with open(out_csv, "a") as f:
+            for k, v in gate_row.items():
+                f.write(f"adaptive_{k},{v:.3f}\n")
+
+    TRACER.export_otlp_json(out_traces)
+    print(f"Saved run: {run_id} ({store.root})")
     print(f"Saved summary: {out_csv}")
+    print(f"Saved traces: {out_traces}")
+    print("LLM cache:", llm_cache.stats())
     print(f"Faithfulness rate: {mean(faithful_flags):.3f}")
     print(f"Avg retrieval ms: {mean(total_latency):.1f}")
 
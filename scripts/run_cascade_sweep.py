@@ -0,0 +1,158 @@
+import json
+import os
+import time
+from statistics import mean
+from datetime import datetime
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from ragbench.bench.schema import BenchItem
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.rerank.providers import CrossEncoderReranker
+from ragbench.rerank.cascade import CascadeReranker, LexicalOverlapScorer
+from ragbench.utils.tracing import TRACER, latency_columns
+
+BENCH_PATH = "benchmarks/sample.jsonl"
+COLLECTION = "demo_k8s_helm"
+DENSE_TOP_K = 50
+RERANK_TOP_N = 3
+RERANK_MODEL = "BAAI/bge-reranker-base"
+
+FIRST_STAGES = ["lexical", "cross-encoder/ms-marco-MiniLM-L-6-v2"]
+TOP_M_LIST = [5, 10, 20, 30]
+
+def load_jsonl(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def recall_at_k(retrieved_chunks, gold_substring, k: int) -> int:
+    if not gold_substring:
+        return 0
+    if isinstance(gold_substring, str):
+        gold_substring = [gold_substring]
+    for chunk in retrieved_chunks[:k]:
+        chunk_lower = (chunk or "").lower()
+        if any(sub.lower() in chunk_lower for sub in gold_substring):
+            return 1
+    return 0
+
+def gold_recall(items, reranked_list):
+    flags = [
+        recall_at_k([it.text for it in reranked], gold, RERANK_TOP_N)
+        for (_, gold), reranked in zip(items, reranked_list)
+        if gold
+    ]
+    return mean(flags) if flags else 0
+
+def audited_recall(traces, stage: int) -> float:
+    # recall is None for queries without a reference top-n (audit off, no candidates); nan if none has one
+    recalls = [t["stages"][stage]["recall"] for t in traces if t["stages"][stage]["recall"] is not None]
+    return mean(recalls) if recalls else float("nan")
+
+def main():
+    os.makedirs("results", exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    items = []
+    for raw in load_jsonl(BENCH_PATH):
+        item = BenchItem(**raw)
+        gold = (raw.get("gold_doc_contains") or raw.get("must_contain")) if item.gold_answer is not None else None
+        items.append((item, gold))
+    questions = [item.question for item, _ in items]
+
+    # dense candidates once; every cascade configuration reranks the same lists
+    retriever = RagPipeline(RagConfig(
+        collection=COLLECTION,
+        dense_top_k=DENSE_TOP_K,
+        use_rerank=False,
+        embed_cache_dir=DEFAULT_CACHE_DIR,
+    ))
+    candidates_list = [
+        [(d["text"], d["payload"], d["score"]) for d in r["dense_results"]]
+        for r in retriever.run_batch(questions)
+    ]
+
+    final = CrossEncoderReranker(model=RERANK_MODEL)
+    final.rerank_batch(questions[:1], candidates_list[:1], top_n=RERANK_TOP_N)  # warmup
+
+    # one query at a time, so the rerank spans give real per-query p50/p90/p99
+    mark = TRACER.mark()
+    t0 = time.perf_counter()
+    reference = []
+    for q, cands in zip(questions, candidates_list):
+        with TRACER.span("rerank", model=RERANK_MODEL, first_stage="none"):
+            reference.extend(final.rerank_batch([q], [cands], top_n=RERANK_TOP_N))
+    full_ms = (time.perf_counter() - t0) * 1000 / len(questions)
+    full_latency = latency_columns(TRACER.since(mark))
+
+    rows = [{
+        "first_stage": "none",
+        "top_m": DENSE_TOP_K,
+        "first_stage_ms": 0.0,
+        "final_ms": full_ms,
+        "total_rerank_ms": full_ms,
+        "first_stage_recall": 1.0,
+        "final_recall": 1.0,
+        f"gold_recall@{RERANK_TOP_N}": gold_recall(items, reference),
+        **full_latency,
+    }]
+
+    for first_name in FIRST_STAGES:
+        first = LexicalOverlapScorer() if first_name == "lexical" else CrossEncoderReranker(model=first_name)
+        for top_m in TOP_M_LIST:
+            cascade = CascadeReranker([(first_name, first, top_m)], final)
+            mark = TRACER.mark()
+            out, traces = [], []
+            for i, (q, cands) in enumerate(zip(questions, candidates_list)):
+                with TRACER.span("rerank", model=RERANK_MODEL, first_stage=first_name, top_m=top_m):
+                    o, t = cascade.rerank_batch_traced([q], [cands], top_n=RERANK_TOP_N, reference=reference[i:i + 1])
+                out.extend(o)
+                traces.extend(t)
+            first_ms = mean(t["stages"][0]["ms"] for t in traces)
+            final_ms = mean(t["stages"][1]["ms"] for t in traces)
+            rows.append({
+                "first_stage": first_name,
+                "top_m": top_m,
+                "first_stage_ms": first_ms,
+                "final_ms": final_ms,
+                "total_rerank_ms": first_ms + final_ms,
+                "first_stage_recall": audited_recall(traces, 0),
+                "final_recall": audited_recall(traces, 1),
+                f"gold_recall@{RERANK_TOP_N}": gold_recall(items, out),
+                **latency_columns(TRACER.since(mark)),
+            })
+
+    df = pd.DataFrame(rows)
+    csv_path = f"results/cascade_sweep_{ts}.csv"
+    df.to_csv(csv_path, index=False)
+
+    # recall of the uncascaded top-n vs rerank latency, one curve per first stage
+    plt.figure()
+    for first_name in FIRST_STAGES:
+        sub = df[df["first_stage"] == first_name].sort_values("top_m")
+        plt.plot(sub["total_rerank_ms"], sub["final_recall"], marker="o", label=first_name)
+        for _, r in sub.iterrows():
+            plt.text(r["total_rerank_ms"], r["final_recall"], f"M={r['top_m']}")
+    plt.axvline(full_ms, linestyle="--", color="gray", label=f"full rerank ({DENSE_TOP_K})")
+    plt.xlabel("Rerank latency per query (ms)")
+    plt.ylabel(f"Recall of full-rerank top-{RERANK_TOP_N}")
+    plt.title("Cascade: recall loss vs latency")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(f"results/cascade_sweep_{ts}.png")
+    plt.close()
+
+    traces_path = TRACER.export_otlp_json(f"results/traces_cascade_sweep_{ts}.otlp.json")
+
+    print("\nSaved:")
+    print(csv_path)
+    print(traces_path)
+    print("results/cascade_sweep_*.png")
+    print("\nSummary:")
+    print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
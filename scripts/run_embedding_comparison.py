@@ -1,12 +1,19 @@
 import json
 import os
+import time
 from statistics import mean
 from datetime import datetime
 import matplotlib.pyplot as plt
 import pandas as pd
 
 from ragbench.bench.schema import BenchItem
-from ragbench.pipeline.simple_rag import run_rag
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline, build_embedder, build_reranker
+from ragbench.bench.sharded import run_sharded
+from ragbench.store.bm25 import BM25Index
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.rerank.adaptive import RerankGate, simulate_gate, gate_summary
+from ragbench.utils.results_store import ResultsStore, retrieval_columns, run_record_from_retrieval
+from ragbench.utils.tracing import TRACER, latency_columns
 
 BENCH_PATH = "benchmarks/sample.jsonl"
 
@@ -27,6 +34,23 @@ COLLECTIONS = [
 
 K_LIST = [1, 3, 5, 10]
 
+# (retrieval mode, candidates sent to the cross-encoder): does hybrid reach dense@50 recall with fewer?
+RETRIEVAL_CONFIGS = [
+    ("dense", 50),
+    ("hybrid", 10),
+    ("hybrid", 20),
+]
+
+# worker processes for retrieval; None = half the cores, torch threads split evenly between them
+WORKERS = None
+
+# sharded shards overlap on the same cores, so their timings are throughput-mode only;
+# latency columns and the latency plot come from a sequential single-process pass over these many questions
+TIMING_QUESTIONS = 20
+
+# adaptive reranking replayed over the always-rerank results (recall@k and skip rate)
+RERANK_GATE = RerankGate(mode="margin", threshold=0.05)
+
 def load_jsonl(path):
     with open(path, "r") as f:
         for line in f:
@@ -49,67 +73,138 @@ def recall_at_k(retrieved_chunks, gold_substring: str, k: int) -> int:
                 return 1
     return 0
 
+def variant_label(c, mode: str, candidates: int) -> str:
+    return f"{c['label']} / {mode}@{candidates}"
+
+def summarize(c, mode: str, candidates: int, items, retrievals, timed, spans):
+    # Only compute recall on answerable items with gold_doc_contains
+    rec = {k: [] for k in K_LIST}
+    gated_rec = {k: [] for k in K_LIST}
+    gated = simulate_gate(retrievals, RERANK_GATE)
+
+    for (item, gold_sub), retr, gated_retr in zip(items, retrievals, gated):
+        chunks = retr["context_chunks"]
+        for k in K_LIST:
+            rec[k].append(recall_at_k(chunks, gold_sub, k))
+            gated_rec[k].append(recall_at_k(gated_retr["context_chunks"], gold_sub, k))
+
+    latencies = [r["timings_ms"]["total_retrieval"] for r in timed]
+    rerank_ms = [r["timings_ms"]["rerank"] for r in timed]
+
+    row = {
+        "label": variant_label(c, mode, candidates),
+        "embedding": c["label"],
+        "collection": c["name"],
+        "retrieval_mode": mode,
+        "rerank_candidates": candidates,
+        "avg_retrieval_ms": mean(latencies) if latencies else 0,
+        "avg_rerank_ms": mean(rerank_ms) if rerank_ms else 0,
+        "timed_items": len(timed),
+    }
+    for k in K_LIST:
+        row[f"recall@{k}"] = mean(rec[k]) if rec[k] else 0
+
+    row["adaptive_skip_rate"] = gate_summary(gated)["skip_rate"]
+    row["adaptive_rerank_ms_saved"] = gate_summary(simulate_gate(timed, RERANK_GATE))["avg_rerank_ms_saved"]
+    for k in K_LIST:
+        row[f"adaptive_recall@{k}_delta"] = (mean(gated_rec[k]) if gated_rec[k] else 0) - row[f"recall@{k}"]
+    row.update(latency_columns(spans))
+    return row
+
 def main():
     os.makedirs("results", exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     rows = []
 
+    # skip unanswerables for recall@k
+    items = []
+    for raw in load_jsonl(BENCH_PATH):
+        item = BenchItem(**raw)
+        gold_sub = raw.get("gold_doc_contains") or raw.get("must_contain")
+        if item.gold_answer is None or not gold_sub:
+            continue
+        items.append((item, gold_sub))
+    questions = [item.question for item, _ in items]
+
+    # every (collection, retrieval config) is an independent task; their shards share one process pool,
+    # so collections run concurrently and each worker loads a given embedder/reranker once
+    tasks, labels = [], []
     for c in COLLECTIONS:
-        label = c["label"]
-        collection = c["name"]
-
-        # Only compute recall on answerable items with gold_doc_contains
-        rec = {k: [] for k in K_LIST}
-        latencies = []
-        rerank_ms = []
-
-        for raw in load_jsonl(BENCH_PATH):
-            item = BenchItem(**raw)
-            gold_sub = raw.get("gold_doc_contains") or raw.get("must_contain")
-
-            # skip unanswerables for recall@k
-            if item.gold_answer is None or not gold_sub:
-                continue
-
-            retr = run_rag(
-                question=item.question,
-                collection=collection,
-                dense_top_k=50,
+        for mode, candidates in RETRIEVAL_CONFIGS:
+            config = RagConfig(
+                collection=c["name"],
+                dense_top_k=candidates,
                 use_rerank=True,
                 rerank_top_n=3,
                 embed_kind=c["embed_kind"],
-                embed_model=c["embed_model"]
+                embed_model=c["embed_model"],
+                embed_cache_dir=DEFAULT_CACHE_DIR,
+                retrieval_mode=mode,
             )
-
-            chunks = retr["context_chunks"]
-            for k in K_LIST:
-                rec[k].append(recall_at_k(chunks, gold_sub, k))
-
-            latencies.append(retr["timings_ms"]["total_retrieval"])
-            rerank_ms.append(retr["timings_ms"]["rerank"])
-
-        row = {
-            "embedding": label,
-            "collection": collection,
-            "avg_retrieval_ms": mean(latencies) if latencies else 0,
-            "avg_rerank_ms": mean(rerank_ms) if rerank_ms else 0,
-        }
-        for k in K_LIST:
-            row[f"recall@{k}"] = mean(rec[k]) if rec[k] else 0
-
-        rows.append(row)
+            if mode == "hybrid" and not BM25Index(config.collection, data_dir=config.sparse_dir).exists():
+                print(f"Skipping {c['label']} {mode}: no BM25 index for '{config.collection}' under {config.sparse_dir}")
+                continue
+            tasks.append((config, questions))
+            labels.append((c, mode, candidates))
+
+    # recall from the sharded run; its per-query timings are not latencies, so only report throughput
+    t0 = time.perf_counter()
+    sharded = run_sharded(tasks, n_workers=WORKERS)
+    wall_s = time.perf_counter() - t0
+    n_queries = sum(len(q) for _, q in tasks)
+    print(f"Sharded run: {n_queries} retrievals in {wall_s:.1f}s ({n_queries / wall_s:.1f} q/s, throughput mode)")
+
+    # per-item retrievals of every config (variant = its label) go to the results store; the CSV is the summary
+    store, run_id = ResultsStore(), ResultsStore.new_run_id("embedding_comparison")
+    store_records, evals = [], []
+    for (c, mode, candidates), (retrievals, _) in zip(labels, sharded):
+        for (item, _), retr in zip(items, retrievals):
+            store_records.append(run_record_from_retrieval(retr))
+            evals.append({
+                "item_id": item.id,
+                "variant": variant_label(c, mode, candidates),
+                "gold_answer": item.gold_answer,
+                **retrieval_columns(retr),
+            })
+    run_config = {
+        "bench": BENCH_PATH,
+        "collections": COLLECTIONS,
+        "retrieval_configs": RETRIEVAL_CONFIGS,
+        "timings": "sharded run: concurrent workers, throughput only",
+    }
+    store.write_run(run_id, store_records, evals, config=run_config, script="run_embedding_comparison")
+
+    # latency: one config at a time in this process, after the pool is gone, so nothing else competes
+    # for the cores and torch keeps its default (all-core) threads. Models are loaded once, before any
+    # timing: one embedder per embedding model, without the disk cache so query embedding is really
+    # timed (the sharded run filled it), and one shared reranker.
+    embedders = {}
+    for config, _ in tasks:
+        key = (config.embed_kind, config.embed_model)
+        if key not in embedders:
+            embedders[key] = build_embedder(*key)
+            embedders[key].embed_queries(questions[:1])  # warm-up: first-call init stays out of the timings
+    reranker = build_reranker(tasks[0][0]) if tasks else None
+
+    for (c, mode, candidates), (config, _), (retrievals, _) in zip(labels, tasks, sharded):
+        pipeline = RagPipeline(config, embedder=embedders[(config.embed_kind, config.embed_model)], reranker=reranker)
+        mark = TRACER.mark()
+        timed = pipeline.run_batch(questions[:TIMING_QUESTIONS])
+        spans = TRACER.since(mark)
+        rows.append(summarize(c, mode, candidates, items, retrievals, timed, spans))
 
     df = pd.DataFrame(rows)
     csv_path = f"results/embedding_comparison_{ts}.csv"
     df.to_csv(csv_path, index=False)
+    traces_path = TRACER.export_otlp_json(f"results/traces_embedding_comparison_{ts}.otlp.json")
 
     # Plot recall@k curves
     plt.figure()
     for _, r in df.iterrows():
         xs = K_LIST
         ys = [r[f"recall@{k}"] for k in K_LIST]
-        plt.plot(xs, ys, marker="o", label=r["embedding"])
+        plt.plot(xs, ys, marker="o", label=r["label"])
     plt.xlabel("k")
     plt.ylabel("Recall@k")
     plt.title("Embedding Retrieval Recall@k")
@@ -121,15 +216,17 @@ def main():
 
     # Plot latency
     plt.figure()
-    plt.bar(df["embedding"], df["avg_retrieval_ms"])
-    plt.title("Avg Retrieval Latency (Embedding-only)")
+    plt.bar(df["label"], df["avg_retrieval_ms"])
+    plt.title(f"Avg Retrieval + Rerank Latency (sequential, {TIMING_QUESTIONS} queries)")
     plt.xticks(rotation=20)
     plt.tight_layout()
     plt.savefig(f"results/embedding_latency_{ts}.png")
     plt.close()
 
     print("\nSaved:")
+    print(f"run {run_id} ({store.root})")
     print(csv_path)
+    print(traces_path)
     print("results/recall_at_k_*.png")
     print("results/embedding_latency_*.png")
     print("\nSummary:")
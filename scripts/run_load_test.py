@@ -0,0 +1,119 @@
+import argparse
+import os
+from datetime import datetime
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.embed.mock_provider import MockEmbeddingProvider
+from ragbench.utils.tracing import TRACER
+from ragbench.bench.loadgen import (
+    LOAD_STAGES, load_questions, run_closed_loop, run_open_loop, summarize, saturation_point,
+)
+
+BENCH_GLOB = "benchmarks/*.jsonl"
+COLLECTION = "demo_k8s_helm"
+EMBED_KIND = "openai"
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIM = 1536  # vector size of EMBED_MODEL's collection; the mock provider must match it
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32]  # closed loop: requests in flight
+RATE_LEVELS = [1, 5, 10, 25, 50]  # open loop: Poisson arrivals per second
+DURATION_S = 20.0
+OPEN_LOOP_WORKERS = 64
+MOCK_LATENCY_MS = 0.0  # added per embedding call by the mock provider
+SATURATION_FACTOR = 2.0  # a stage saturates once its p99 doubles relative to the lightest load
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput vs latency load test of the retrieval pipeline")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--levels", type=float, nargs="+", help="concurrency (closed) or QPS (open) levels")
+    parser.add_argument("--duration", type=float, default=DURATION_S, help="seconds per level")
+    parser.add_argument("--bench", default=BENCH_GLOB)
+    parser.add_argument("--collection", default=COLLECTION)
+    parser.add_argument("--no-rerank", action="store_true")
+    parser.add_argument(
+        "--mock-embed", action="store_true",
+        help="replace the embedding provider with a local mock to isolate retrieval and rerank capacity",
+    )
+    parser.add_argument("--dim", type=int, default=EMBED_DIM, help="mock embedding size (= the collection's vector size)")
+    parser.add_argument(
+        "--embed-cache", action="store_true",
+        help="serve query embeddings from the on-disk cache; questions are cycled, so after the first "
+             "pass embed_query measures cache hits instead of the provider",
+    )
+    args = parser.parse_args()
+
+    os.makedirs("results", exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    config = RagConfig(
+        collection=args.collection,
+        embed_kind=EMBED_KIND,
+        embed_model=EMBED_MODEL,
+        embed_cache_dir=DEFAULT_CACHE_DIR if args.embed_cache else None,
+        use_rerank=not args.no_rerank,
+    )
+    embedder = None
+    if args.mock_embed:
+        embedder = MockEmbeddingProvider(args.dim, latency_ms=MOCK_LATENCY_MS)
+    pipeline = RagPipeline(config, embedder=embedder)
+    questions = load_questions(args.bench)
+
+    levels = args.levels or (CONCURRENCY_LEVELS if args.mode == "closed" else RATE_LEVELS)
+    pipeline.run(questions[0])  # warm up models and connections
+
+    rows = []
+    for level in levels:
+        # latencies come from the run records; drop the previous level's spans so memory stays flat
+        TRACER.reset()
+        if args.mode == "closed":
+            results, wall_s = run_closed_loop(pipeline.run, questions, int(level), args.duration)
+        else:
+            results, wall_s = run_open_loop(pipeline.run, questions, level, args.duration, max_workers=OPEN_LOOP_WORKERS)
+        row = {
+            "mode": args.mode, "level": level, "mock_embed": args.mock_embed, "embed_cache": args.embed_cache,
+            **summarize(results, wall_s),
+        }
+        rows.append(row)
+        print(
+            f"[{args.mode}={level}] {row['throughput_qps']:.1f} qps, "
+            f"p50={row.get('latency_p50_ms', 0):.1f} ms, p99={row.get('latency_p99_ms', 0):.1f} ms, "
+            f"errors={row['error_rate']:.1%}"
+        )
+
+    df = pd.DataFrame(rows)
+    csv_path = f"results/load_{args.mode}_{ts}.csv"
+    df.to_csv(csv_path, index=False)
+
+    print("\nSaturation (first level where p99 > "
+          f"{SATURATION_FACTOR:g}x the lightest level):")
+    for stage in ("latency",) + LOAD_STAGES:
+        col = f"{stage}_p99_ms"
+        if col in df:
+            print(f"  {stage}: {saturation_point(levels, df[col].tolist(), SATURATION_FACTOR)}")
+
+    plt.figure()
+    for p in ("p50", "p99"):
+        if f"latency_{p}_ms" in df:
+            plt.plot(df["throughput_qps"], df[f"latency_{p}_ms"], marker="o", label=p)
+    for _, r in df.iterrows():
+        plt.annotate(f"{r['level']:g}", (r["throughput_qps"], r.get("latency_p99_ms", 0)))
+    plt.xlabel("Throughput (qps)")
+    plt.ylabel("Latency (ms)")
+    plt.title(f"Throughput vs latency ({args.mode} loop)")
+    plt.legend()
+    plt.tight_layout()
+    png_path = f"results/load_{args.mode}_{ts}.png"
+    plt.savefig(png_path)
+    plt.close()
+
+    print("\nSaved:")
+    print(csv_path)
+    print(png_path)
+    print("\nSummary:")
+    print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from ragbench.bench.microbench import DEFAULT_BASELINE_PATH, MicroSuite, compare, load_results
+
+SUITES = ["embed", "store", "rerank", "bm25"]
+
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+EMBED_BATCH_SIZES = [1, 8, 32, 128]
+
+STORE_KIND = "numpy"  # or "qdrant" (uses a scratch collection, dropped afterwards)
+STORE_DIMS = [384, 768, 1536]
+STORE_POINTS = 5_000
+UPSERT_BATCH_SIZES = [64, 256]
+SEARCH_TOP_K = [1, 10, 50]
+SEARCH_QUERIES = 32
+
+RERANK_MODEL = "BAAI/bge-reranker-base"
+RERANK_CANDIDATES = [10, 25, 50, 100]
+
+BM25_DOCS = 20_000
+
+WORDS = (
+    "helm chart values template kubernetes pod deployment replica terraform state backend "
+    "module provider resource cluster node service ingress secret config map volume"
+).split()
+
+def synthetic_texts(n: int, words: int = 40, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=words)) for _ in range(n)]
+
+def unit_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+def bench_embed(suite: MicroSuite):
+    from ragbench.embed.local_provider import LocalSTEmbeddingProvider
+    provider = LocalSTEmbeddingProvider(EMBED_MODEL)
+    for bs in EMBED_BATCH_SIZES:
+        texts = synthetic_texts(bs)
+        suite.run("embed.encode", lambda: provider.embed_documents(texts), items=bs, model=EMBED_MODEL, batch_size=bs)
+
+def bench_store(suite: MicroSuite):
+    from ragbench.pipeline.simple_rag import build_store
+    from ragbench.store.numpy_store import NumpyStore
+
+    for dim in STORE_DIMS:
+        vectors = unit_vectors(STORE_POINTS, dim)
+        payloads = [{"doc_id": i, "text": f"doc {i}"} for i in range(STORE_POINTS)]
+        with tempfile.TemporaryDirectory() as tmp:
+            if STORE_KIND == "numpy":
+                store = NumpyStore(f"microbench_{dim}", dim, data_dir=tmp)
+            else:
+                store = build_store(STORE_KIND, f"ragbench_microbench_{dim}", dim)
+            store.recreate_collection()
+            try:
+                for bs in UPSERT_BATCH_SIZES:
+                    chunk = slice(0, bs)
+                    suite.run(
+                        "store.upsert", lambda: (store.upsert(vectors[chunk], payloads[chunk], batch_size=bs), store.flush()),
+                        items=bs, store=STORE_KIND, dim=dim, batch_size=bs,
+                    )
+                store.upsert(vectors, payloads)
+                queries = unit_vectors(SEARCH_QUERIES, dim, seed=1)
+                for k in SEARCH_TOP_K:
+                    suite.run("store.search", lambda: store.search(queries[0], top_k=k), store=STORE_KIND, dim=dim, top_k=k)
+                    suite.run(
+                        "store.search_batch", lambda: store.search_batch(queries, top_k=k),
+                        items=SEARCH_QUERIES, store=STORE_KIND, dim=dim, top_k=k,
+                    )
+            finally:
+                if STORE_KIND == "qdrant":
+                    store.client.delete_collection(store.collection_name)
+
+def bench_rerank(suite: MicroSuite):
+    from ragbench.rerank.providers import CrossEncoderReranker
+    reranker = CrossEncoderReranker(RERANK_MODEL)
+    query = "How are Helm chart values injected into templates?"
+    for n in RERANK_CANDIDATES:
+        candidates = [(t, {}, 0.0) for t in synthetic_texts(n, words=120)]
+        suite.run(
+            "rerank", lambda: reranker.rerank(query, candidates, top_n=3),
+            items=n, model=RERANK_MODEL, candidates=n,
+        )
+
+def bench_bm25(suite: MicroSuite):
+    from ragbench.store.bm25 import BM25Index
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index("microbench", data_dir=tmp)
+        texts = synthetic_texts(BM25_DOCS)
+        index.add(texts, [{"doc_id": i, "text": t} for i, t in enumerate(texts)])
+        index.save()
+        for k in SEARCH_TOP_K:
+            suite.run("bm25.search", lambda: index.search("helm values template", top_k=k), docs=BM25_DOCS, top_k=k)
+
+BENCHES = {"embed": bench_embed, "store": bench_store, "rerank": bench_rerank, "bm25": bench_bm25}
+
+def cmd_run(args):
+    suite = MicroSuite(warmup=args.warmup, trials=args.trials)
+    for name in args.suites:
+        BENCHES[name](suite)
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = suite.save(f"results/microbench_{ts}.json")
+    csv_path = f"results/microbench_{ts}.csv"
+    pd.DataFrame([r.row() for r in suite.results]).to_csv(csv_path, index=False)
+    print("\nSaved:")
+    print(json_path)
+    print(csv_path)
+    if args.save_baseline:
+        print(suite.save(args.baseline))
+
+def cmd_compare(args):
+    rows = compare(load_results(args.baseline), load_results(args.current), alpha=args.alpha, min_slowdown=args.min_slowdown)
+    df = pd.DataFrame(rows)
+    print(df.to_string(index=False))
+    regressions = df[df["status"] == "REGRESSION"] if len(df) else df
+    if len(regressions):
+        print(f"\n{len(regressions)} significant regression(s) vs {args.baseline}")
+        sys.exit(1)
+    print(f"\nNo significant regressions vs {args.baseline}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Component microbenchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run suites and save results under results/")
+    run.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--trials", type=int, default=15)
+    run.add_argument("--save-baseline", action="store_true", help="also write the run to --baseline")
+    run.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="flag significant slowdowns of a run against a baseline (exit 1 if any)")
+    cmp.add_argument("current", help="results/microbench_*.json")
+    cmp.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    cmp.add_argument("--alpha", type=float, default=0.01)
+    cmp.add_argument("--min-slowdown", type=float, default=0.10, help="ignore median slowdowns below this fraction")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    os.makedirs("results", exist_ok=True)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
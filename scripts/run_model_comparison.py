@@ -1,16 +1,23 @@
+import argparse
 import json
 import os
+from dataclasses import asdict
 from statistics import mean
 from datetime import datetime
 import matplotlib.pyplot as plt
 import pandas as pd
 
 from ragbench.bench.schema import BenchItem
-from ragbench.pipeline.simple_rag import run_rag
-from ragbench.generation.answer import generate_answer
-from ragbench.eval.judge import judge_faithfulness
+from ragbench.pipeline.simple_rag import RagConfig
+from ragbench.bench.planner import EmbedderSpec, ExperimentPlan, grid
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.bench.checkpoint import RunCheckpoint
+from ragbench.rerank.cache import DEFAULT_RERANK_CACHE_PATH
 from ragbench.eval.pricing import estimate_cost
 from ragbench.eval.refusal import is_refusal
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.tracing import TRACER, latency_columns
+from ragbench.utils.results_store import ResultsStore, retrieval_columns, run_record_from_retrieval
 
 COLLECTION = "demo_k8s_helm"
 
@@ -22,6 +29,17 @@ GENERATOR_MODELS = [
 
 JUDGE_MODEL = "gpt-4.1-mini"
 
+# threshold guardrail: refuse without calling the generator when retrieval looks weak
+TAU_DENSE = 0.3
+TAU_RERANK = 0.2
+
+def should_answer(retr) -> bool:
+    if retr["top_dense_score"] < TAU_DENSE:
+        return False
+    if retr["top_rerank_score"] is not None and retr["top_rerank_score"] < TAU_RERANK:
+        return False
+    return True
+
 def load_jsonl(path):
     with open(path, "r") as f:
         for line in f:
@@ -29,12 +47,63 @@ def load_jsonl(path):
                 yield json.loads(line)
 
 def main():
+    parser = argparse.ArgumentParser(description="Generator model comparison")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue a crashed run, skipping finished (model, item) pairs")
+    args = parser.parse_args()
+
     os.makedirs("results", exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     bench_path = "benchmarks/sample.jsonl"
 
     summary_rows = []
 
+    config = RagConfig(
+        collection=COLLECTION,
+        dense_top_k=10,
+        use_rerank=True,
+        rerank_top_n=3,
+        embed_cache_dir=DEFAULT_CACHE_DIR,
+        rerank_cache=True,
+        rerank_cache_path=DEFAULT_RERANK_CACHE_PATH,
+    )
+    run_config = {"rag": asdict(config), "generators": GENERATOR_MODELS, "judge_model": JUDGE_MODEL, "bench": bench_path}
+
+    llm_cache = LLMCache()
+    TRACER.reset()
+
+    items = [BenchItem(**raw) for raw in load_jsonl(bench_path)]
+    keys = [f"{model}/{item.id}" for model in GENERATOR_MODELS for item in items]
+    if args.resume:
+        ckpt = RunCheckpoint.resume(args.resume, run_config, keys)
+    else:
+        ckpt = RunCheckpoint.create(ResultsStore.new_run_id("model_comparison"), run_config, keys)
+    print(f"Run {ckpt.run_id}: {ckpt.progress()} (model, item) pairs done")
+
+    # retrieval doesn't depend on the generator: the planner runs it once per item and fans it out to every model
+    points = grid(
+        [EmbedderSpec(config.collection, config.embed_kind, config.embed_model)],
+        [config.dense_top_k],
+        [config.rerank_model],
+        GENERATOR_MODELS,
+        [JUDGE_MODEL],
+    )
+    plan = ExperimentPlan(points, items, done=lambda p, i: f"{p.generator}/{items[i].id}" in ckpt.records)
+    print(plan.describe())
+    plan.execute(
+        config,
+        should_answer=should_answer,
+        cache=llm_cache,
+        on_result=lambda p, i, res: ckpt.append(f"{p.generator}/{items[i].id}", {
+            "model": p.generator,
+            "item_id": items[i].id,
+            "answer": res["answer"],
+            "judge": res["judge"],
+            "usage": res["usage"],
+            "retrieval": res["retrieval"],
+        }),
+    )
+
+    store_records, evals = [], []
     for model in GENERATOR_MODELS:
         faithful_flags = []
         answer_success_flags = []
@@ -45,53 +114,10 @@ def main():
         total_tokens = []
         retrieval_latencies = []
 
-        print(f"\nRunning model: {model}")
-
-        for raw in load_jsonl(bench_path):
-            item = BenchItem(**raw)
-
-            retr = run_rag(
-                question=item.question,
-                collection=COLLECTION,
-                dense_top_k=10,
-                use_rerank=True,
-                rerank_top_n=3,
-            )
-
-            # --- threshold guardrail ---
-            tau_dense = 0.3
-            tau_rerank = 0.2
-
-            should_answer = True
-
-            if retr["top_dense_score"] < tau_dense:
-                should_answer = False
-
-            if retr["top_rerank_score"] is not None and retr["top_rerank_score"] < tau_rerank:
-                should_answer = False
-
-            if not should_answer:
-                answer = "I don't know based on the provided context."
-                ans_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-            else:
-                answer, ans_usage = generate_answer(
-                    question=item.question,
-                    context_chunks=retr["context_chunks"],
-                    model=model,
-                )
-
-            answer, ans_usage = generate_answer(
-                question=item.question,
-                context_chunks=retr["context_chunks"],
-                model=model,
-            )
-
-            verdict, judge_usage = judge_faithfulness(
-                question=item.question,
-                answer=answer,
-                context_chunks=retr["context_chunks"],
-                model=JUDGE_MODEL,
-            )
+        # aggregated from the journal, so resumed pairs count too
+        for item in items:
+            rec = ckpt.records[f"{model}/{item.id}"]
+            answer, ans_usage, verdict, retr = rec["answer"], rec["usage"]["answer"], rec["judge"], rec["retrieval"]
 
             faithful = bool(verdict.get("faithful", False))
             faithful_flags.append(1 if faithful else 0)
@@ -121,6 +147,20 @@ def main():
             total_tokens.append(ans_usage.get("total_tokens", 0))
             retrieval_latencies.append(retr["timings_ms"]["total_retrieval"])
 
+            store_records.append(run_record_from_retrieval(retr))
+            evals.append({
+                "item_id": item.id,
+                "variant": model,
+                "gold_answer": item.gold_answer,
+                "answer": answer,
+                "faithful": faithful,
+                "refused": refused,
+                "judge": verdict,
+                "answer_tokens": (ans_usage or {}).get("total_tokens"),
+                "judge_tokens": (rec["usage"]["judge"] or {}).get("total_tokens"),
+                **retrieval_columns(retr),
+            })
+
         summary_rows.append({
             "model": model,
             "faithfulness_rate": mean(faithful_flags) if faithful_flags else 0,
@@ -131,8 +171,20 @@ def main():
             "avg_cost_usd": mean(total_costs),
             "avg_tokens": mean(total_tokens),
             "avg_retrieval_ms": mean(retrieval_latencies),
+            # judge spans are shared; generate spans are this model's
+            **latency_columns([s for s in TRACER.spans if s.name != "generate" or s.attributes.get("model") == model]),
         })
 
+    # per-item records (variant = generator model) go to the results store once the run is complete;
+    # the CSV below is only the per-model summary
+    store = ResultsStore()
+    if ckpt.manifest["status"] != "stored":
+        ckpt.set_status("storing")
+        store.write_run(ckpt.run_id, store_records, evals, config=run_config, script="run_model_comparison")
+        ckpt.set_status("stored")
+    print("\nLLM cache:", llm_cache.stats())
+    traces_path = TRACER.export_otlp_json(f"results/traces_model_comparison_{ts}.otlp.json")
+
     df = pd.DataFrame(summary_rows)
     csv_path = f"results/model_comparison_{ts}.csv"
     df.to_csv(csv_path, index=False)
@@ -172,7 +224,9 @@ def main():
     plt.savefig(f"results/safety_vs_utility_{ts}.png")
 
     print("\nSaved:")
+    print(f"run {ckpt.run_id} ({ckpt.path}, {store.root})")
     print(csv_path)
+    print(traces_path)
     print("faithfulness_vs_cost_*.png")
     print("safety_vs_utility_*.png")
 
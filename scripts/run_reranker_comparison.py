@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from statistics import mean
+from datetime import datetime
+import pandas as pd
+
+from ragbench.bench.schema import BenchItem
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline, build_reranker
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.eval.ranking import kendall_tau, top_n_overlap
+from ragbench.utils.tracing import TRACER, latency_columns
+
+BENCH_PATH = "benchmarks/sample.jsonl"
+COLLECTION = "demo_k8s_helm"
+DENSE_TOP_K = 50
+RERANK_TOP_N = 3
+
+RERANK_MODEL = "BAAI/bge-reranker-base"
+BATCH_SIZE = 32
+MAX_LENGTH = 512
+NUM_THREADS = 4  # intra-op threads per backend; for torch this sizes the whole process pool
+
+# the torch backend is the reference ordering for the others
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+def load_jsonl(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main():
+    os.makedirs("results", exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    questions = [BenchItem(**raw).question for raw in load_jsonl(BENCH_PATH)]
+
+    # retrieve candidates once; every backend scores the same pairs
+    retriever = RagPipeline(RagConfig(
+        collection=COLLECTION,
+        dense_top_k=DENSE_TOP_K,
+        use_rerank=False,
+        embed_cache_dir=DEFAULT_CACHE_DIR,
+    ))
+    retrievals = retriever.run_batch(questions)
+    pairs_per_q = [[(q, d["text"]) for d in r["dense_results"]] for q, r in zip(questions, retrievals)]
+
+    scores = {}
+    latencies = {}
+    spans = {}
+    for backend in BACKENDS:
+        reranker = build_reranker(RagConfig(
+            collection=COLLECTION,
+            rerank_model=RERANK_MODEL,
+            rerank_backend=backend,
+            rerank_batch_size=BATCH_SIZE,
+            rerank_max_length=MAX_LENGTH,
+            rerank_num_threads=NUM_THREADS,
+        ))
+        reranker.score_pairs(pairs_per_q[0][:BATCH_SIZE])  # warmup
+
+        scores[backend], latencies[backend] = [], []
+        mark = TRACER.mark()
+        for pairs in pairs_per_q:
+            t0 = time.perf_counter()
+            with TRACER.span("rerank", model=RERANK_MODEL, backend=backend):
+                scores[backend].append(reranker.score_pairs(pairs))
+            latencies[backend].append((time.perf_counter() - t0) * 1000)
+        spans[backend] = TRACER.since(mark)
+
+    ref = BACKENDS[0]
+    rows = []
+    for backend in BACKENDS:
+        taus = [kendall_tau(a, b) for a, b in zip(scores[ref], scores[backend])]
+        overlaps = [top_n_overlap(a, b, RERANK_TOP_N) for a, b in zip(scores[ref], scores[backend])]
+        lat = sorted(latencies[backend])
+        rows.append({
+            "backend": backend,
+            "model": RERANK_MODEL,
+            "n_queries": len(questions),
+            "pairs_per_query": DENSE_TOP_K,
+            "avg_ms_per_query": mean(lat) if lat else 0,
+            "p90_ms_per_query": lat[int(0.9 * (len(lat) - 1))] if lat else 0,
+            f"speedup_vs_{ref}": mean(latencies[ref]) / mean(lat) if lat else 0,
+            "kendall_tau": mean(taus) if taus else 0,
+            "min_kendall_tau": min(taus) if taus else 0,
+            f"top{RERANK_TOP_N}_overlap": mean(overlaps) if overlaps else 0,
+            **latency_columns(spans[backend]),
+        })
+
+    df = pd.DataFrame(rows)
+    csv_path = f"results/reranker_comparison_{ts}.csv"
+    df.to_csv(csv_path, index=False)
+
+    print("\nSaved:")
+    print(csv_path)
+    print("\nSummary:")
+    print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
+import argparse
 import json
 import os
-from statistics import mean
+from dataclasses import asdict
 from datetime import datetime
+import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 
 from ragbench.bench.schema import BenchItem
-from ragbench.pipeline.simple_rag import run_rag
-from ragbench.generation.answer import generate_answer
-from ragbench.eval.judge import judge_faithfulness
+from ragbench.pipeline.simple_rag import RagConfig, RagPipeline
+from ragbench.embed.cache import DEFAULT_CACHE_DIR
+from ragbench.rerank.cache import DEFAULT_RERANK_CACHE_PATH
+from ragbench.bench.runner import answer_and_judge_all
 from ragbench.eval.refusal import is_refusal
+from ragbench.eval.threshold import evaluate_tau_grid
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.results_store import ResultsStore, retrieval_columns, run_record_from_retrieval
+from ragbench.utils.tracing import TRACER, STAGES, stage_percentiles
 
 COLLECTION = "demo_k8s_helm"
 GEN_MODEL = "gpt-4.1-mini"
 JUDGE_MODEL = "gpt-4.1-mini"
+CONCURRENCY = 8
 
+# full grid evaluated offline; the short lists below are the curves/labels drawn on plots
+TAU_DENSE_GRID = np.round(np.linspace(0.0, 1.0, 101), 2)
+TAU_RERANK_GRID = np.round(np.linspace(0.0, 1.0, 101), 2)
 TAU_DENSE_LIST = [0.2, 0.3, 0.4]
 TAU_RERANK_LIST = [0.1, 0.2, 0.3]
 
@@ -24,86 +35,136 @@ def load_jsonl(path):
             if line.strip():
                 yield json.loads(line)
 
+def collect_items(bench_path: str, store: ResultsStore, run_id: str) -> pd.DataFrame:
+    """
+    Phase 1: retrieval, generation and judging once per item, written to the results store as run_id.
+    Thresholds only decide whether the answer is used, so nothing here depends on tau.
+    """
+    config = RagConfig(
+        collection=COLLECTION,
+        dense_top_k=10,
+        use_rerank=True,
+        rerank_top_n=3,
+        embed_cache_dir=DEFAULT_CACHE_DIR,
+        rerank_cache=True,
+        rerank_cache_path=DEFAULT_RERANK_CACHE_PATH,
+    )
+    pipeline = RagPipeline(config)
+    llm_cache = LLMCache()
+
+    items = [BenchItem(**raw) for raw in load_jsonl(bench_path)]
+    retrievals = pipeline.run_batch([item.question for item in items])
+    print("Rerank cache:", pipeline.reranker.cache.stats())
+    evaluations = answer_and_judge_all(
+        items,
+        retrievals,
+        answer_model=GEN_MODEL,
+        judge_model=JUDGE_MODEL,
+        concurrency=CONCURRENCY,
+        cache=llm_cache,
+    )
+    print("LLM cache:", llm_cache.stats())
+
+    records, evals = [], []
+    for item, retr, (answer, ans_usage, verdict, judge_usage) in zip(items, retrievals, evaluations):
+        records.append(run_record_from_retrieval(retr))
+        evals.append({
+            "item_id": item.id,
+            "gold_answer": item.gold_answer,
+            "answer": answer,
+            "faithful": bool(verdict.get("faithful", False)),
+            "refused": is_refusal(answer),
+            "judge": verdict,
+            "answer_tokens": (ans_usage or {}).get("total_tokens"),
+            "judge_tokens": (judge_usage or {}).get("total_tokens"),
+            **retrieval_columns(retr),
+        })
+    run_config = {"rag": asdict(config), "answer_model": GEN_MODEL, "judge_model": JUDGE_MODEL, "bench": bench_path}
+    store.write_run(run_id, records, evals, config=run_config, script="run_threshold_sweep")
+    return items_from_store(store, run_id)
+
+def items_from_store(store: ResultsStore, run_id: str) -> pd.DataFrame:
+    """
+    The per-item columns the sweep needs, from a run in the results store.
+    """
+    import pyarrow.dataset as ds
+    table = store.scan(
+        columns=["item_id", "gold_answer", "top_dense_score", "top_rerank_score", "answer", "refused", "faithful"],
+        filter=ds.field("run_id") == run_id,
+    )
+    return pd.DataFrame([
+        {
+            "id": r["item_id"],
+            "answerable": r["gold_answer"] is not None,
+            "top_dense_score": r["top_dense_score"] or 0,
+            "top_rerank_score": r["top_rerank_score"] or 0,
+            "answer": r["answer"],
+            "refused": bool(r["refused"]),
+            "faithful": bool(r["faithful"]),
+        }
+        for r in table.to_pylist()
+    ])
+
+def sweep(items_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Phase 2: vectorised metrics over the full tau grid.
+    """
+    metrics = evaluate_tau_grid(
+        items_df["top_dense_score"].to_numpy(),
+        items_df["top_rerank_score"].to_numpy(),
+        items_df["faithful"].to_numpy(),
+        items_df["refused"].to_numpy(),
+        items_df["answerable"].to_numpy(),
+        TAU_DENSE_GRID,
+        TAU_RERANK_GRID,
+    )
+    td, tr = np.meshgrid(TAU_DENSE_GRID, TAU_RERANK_GRID, indexing="ij")
+    data = {"tau_dense": td.ravel(), "tau_rerank": tr.ravel()}
+    for name, grid in metrics.items():
+        data[name] = grid.ravel()
+    return pd.DataFrame(data)
+
 def main():
+    parser = argparse.ArgumentParser(description="tau_dense x tau_rerank gating sweep")
+    parser.add_argument(
+        "--items",
+        help="per-item results of a previous run: its run id in the results store (or an older "
+        "threshold_items_*.csv); skips retrieval and LLM calls",
+    )
+    args = parser.parse_args()
+
     os.makedirs("results", exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     bench_path = "benchmarks/sample.jsonl"
 
-    rows = []
-
-    for tau_dense in TAU_DENSE_LIST:
-        for tau_rerank in TAU_RERANK_LIST:
-            answer_success_flags = []
-            hallucination_flags = []
-            false_refusal_flags = []
-            faithful_flags = []
-
-            for raw in load_jsonl(bench_path):
-                item = BenchItem(**raw)
-
-                retr = run_rag(
-                    question=item.question,
-                    collection=COLLECTION,
-                    dense_top_k=10,
-                    use_rerank=True,
-                    rerank_top_n=3,
-                )
-
-                top_dense = retr.get("top_dense_score", 0) or 0
-                top_rerank = retr.get("top_rerank_score", 0) or 0
-
-                should_answer = (top_dense >= tau_dense) and (top_rerank >= tau_rerank)
-
-                if not should_answer:
-                    answer = "I don't know based on the provided context."
-                    ans_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-                    verdict = {"faithful": True, "confidence": 1.0, "rationale": "Refusal."}
-                else:
-                    answer, ans_usage = generate_answer(
-                        question=item.question,
-                        context_chunks=retr["context_chunks"],
-                        model=GEN_MODEL,
-                    )
-                    verdict, _ = judge_faithfulness(
-                        question=item.question,
-                        answer=answer,
-                        context_chunks=retr["context_chunks"],
-                        model=JUDGE_MODEL,
-                    )
-
-                faithful = bool(verdict.get("faithful", False))
-                faithful_flags.append(1 if faithful else 0)
-
-                refused = is_refusal(answer)
-                is_answerable = item.gold_answer is not None
-
-                if is_answerable:
-                    answer_success = (not refused) and faithful
-                    false_refusal = refused
-                    answer_success_flags.append(1 if answer_success else 0)
-                    false_refusal_flags.append(1 if false_refusal else 0)
-                else:
-                    hallucination = not refused
-                    hallucination_flags.append(1 if hallucination else 0)
-
-            rows.append({
-                "tau_dense": tau_dense,
-                "tau_rerank": tau_rerank,
-                "faithfulness_rate": mean(faithful_flags) if faithful_flags else 0,
-                "answer_success_rate": mean(answer_success_flags) if answer_success_flags else 0,
-                "false_refusal_rate": mean(false_refusal_flags) if false_refusal_flags else 0,
-                "hallucination_rate": mean(hallucination_flags) if hallucination_flags else 0,
-            })
-
-    df = pd.DataFrame(rows)
+    store = ResultsStore()
+    if args.items and args.items.endswith(".csv"):
+        items_df = pd.read_csv(args.items, keep_default_na=False)
+    elif args.items:
+        items_df = items_from_store(store, args.items)
+        if items_df.empty:
+            raise SystemExit(f"{args.items}: no items in {store.root}")
+    else:
+        run_id = ResultsStore.new_run_id("threshold")
+        items_df = collect_items(bench_path, store, run_id)
+        print(f"Saved run: {run_id} ({store.root})")
+
+        latency_path = f"results/threshold_latency_{ts}.csv"
+        latency = pd.DataFrame.from_dict(stage_percentiles(TRACER.spans, STAGES), orient="index")
+        latency.index.name = "stage"
+        latency.to_csv(latency_path)
+        print("Saved:", latency_path)
+        print("Saved:", TRACER.export_otlp_json(f"results/traces_threshold_{ts}.otlp.json"))
+
+    df = sweep(items_df)
     csv_path = f"results/threshold_sweep_{ts}.csv"
     df.to_csv(csv_path, index=False)
 
     # --- Line plots by tau_dense ---
     plt.figure()
-    for td in sorted(df["tau_dense"].unique()):
-        sub = df[df["tau_dense"] == td].sort_values("tau_rerank")
-        plt.plot(sub["tau_rerank"], sub["answer_success_rate"], marker="o", label=f"tau_dense={td}")
+    for td in TAU_DENSE_LIST:
+        sub = df[np.isclose(df["tau_dense"], td)].sort_values("tau_rerank")
+        plt.plot(sub["tau_rerank"], sub["answer_success_rate"], label=f"tau_dense={td}")
     plt.xlabel("tau_rerank")
     plt.ylabel("answer_success_rate")
     plt.title("Coverage vs Rerank Threshold")
@@ -113,9 +174,9 @@ def main():
     plt.close()
 
     plt.figure()
-    for td in sorted(df["tau_dense"].unique()):
-        sub = df[df["tau_dense"] == td].sort_values("tau_rerank")
-        plt.plot(sub["tau_rerank"], sub["hallucination_rate"], marker="o", label=f"tau_dense={td}")
+    for td in TAU_DENSE_LIST:
+        sub = df[np.isclose(df["tau_dense"], td)].sort_values("tau_rerank")
+        plt.plot(sub["tau_rerank"], sub["hallucination_rate"], label=f"tau_dense={td}")
     plt.xlabel("tau_rerank")
     plt.ylabel("hallucination_rate")
     plt.title("Hallucination vs Rerank Threshold")
@@ -127,8 +188,10 @@ def main():
 
     # Plot: coverage (answer_success) vs hallucination
     plt.figure()
-    plt.scatter(df["hallucination_rate"], df["answer_success_rate"])
-    for i, r in df.iterrows():
+    plt.scatter(df["hallucination_rate"], df["answer_success_rate"], s=4, alpha=0.3)
+    labeled = df[df["tau_dense"].isin(TAU_DENSE_LIST) & df["tau_rerank"].isin(TAU_RERANK_LIST)]
+    plt.scatter(labeled["hallucination_rate"], labeled["answer_success_rate"])
+    for i, r in labeled.iterrows():
         plt.text(r["hallucination_rate"], r["answer_success_rate"], f"d{r['tau_dense']}/r{r['tau_rerank']}", fontsize=8)
     plt.xlabel("Hallucination Rate")
     plt.ylabel("Answer Success Rate")
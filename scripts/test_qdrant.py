@@ -6,7 +6,7 @@ VECTOR_SIZE = 5
 store = QdrantStore(collection_name="test_collection", vector_size=VECTOR_SIZE)
 store.create_collection(recreate=True)
 
-vectors = np.random.rand(3, VECTOR_SIZE).tolist()
+vectors = np.random.rand(3, VECTOR_SIZE).astype(np.float32)
 payloads = [
     {"text":"Kubernetes Deployment example"},
     {"text":"Helm chart configuration"},
@@ -15,7 +15,7 @@ payloads = [
 
 store.upsert(vectors, payloads)
 
-query_vector = np.random.rand(VECTOR_SIZE).tolist()
+query_vector = np.random.rand(VECTOR_SIZE).astype(np.float32)
 results = store.search(query_vector, top_k=2)
 
 for r in results:
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable
+
+DEFAULT_RUNS_DIR = "results/runs"
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def _write_json_atomic(path: str, obj: Any):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class RunCheckpoint:
+    """
+    Crash-safe progress of one benchmark run under runs_dir/<run_id>/:
+      manifest.json   run config (+ fingerprint), expected item keys, status; replaced atomically
+      records.jsonl   one line per finished item, appended with a single write + fsync
+    A crash can at worst leave a torn last line, which is dropped (and truncated) on resume,
+    so an item is either fully recorded or re-run.
+    """
+    def __init__(self, run_id: str, runs_dir: str = DEFAULT_RUNS_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir, run_id)
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.records_path = os.path.join(self.path, "records.jsonl")
+        self._lock = threading.Lock()
+        with open(self.manifest_path, "r") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self.records: Dict[str, Dict[str, Any]] = self._load_records()
+
+    @classmethod
+    def create(
+        cls, run_id: str, config: Dict[str, Any], keys: Iterable[str], runs_dir: str = DEFAULT_RUNS_DIR,
+    ) -> "RunCheckpoint":
+        path = os.path.join(runs_dir, run_id)
+        os.makedirs(path, exist_ok=False)
+        keys = list(keys)
+        _write_json_atomic(os.path.join(path, "manifest.json"), {
+            "run_id": run_id,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "status": "running",
+            "config": config,
+            "config_fingerprint": config_fingerprint(config),
+            "n_items": len(keys),
+            "keys": keys,
+        })
+        open(os.path.join(path, "records.jsonl"), "a").close()
+        return cls(run_id, runs_dir)
+
+    @classmethod
+    def resume(
+        cls,
+        run_id: str,
+        config: Dict[str, Any],
+        keys: Iterable[str] | None = None,
+        runs_dir: str = DEFAULT_RUNS_DIR,
+    ) -> "RunCheckpoint":
+        """
+        Reopens a run; the current config must match the one it was started with, and the
+        current item keys (if given) the ones in its manifest, e.g. after the bench file changed.
+        """
+        ckpt = cls(run_id, runs_dir)
+        if ckpt.manifest["config_fingerprint"] != config_fingerprint(config):
+            raise ValueError(
+                f"Run {run_id} was started with a different config; resume with the original settings "
+                f"(see {ckpt.manifest_path})"
+            )
+        if keys is not None:
+            keys, expected = list(keys), ckpt.manifest["keys"]
+            added = sorted(set(keys) - set(expected))
+            missing = sorted(set(expected) - set(keys))
+            if added or missing:
+                raise ValueError(
+                    f"Run {run_id} was started with different items ({len(added)} new, e.g. {added[:3]}; "
+                    f"{len(missing)} gone, e.g. {missing[:3]}); resume with the original bench file "
+                    f"(see {ckpt.manifest_path})"
+                )
+        return ckpt
+
+    def _load_records(self) -> Dict[str, Dict[str, Any]]:
+        records: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.records_path):
+            return records
+        good = 0
+        with open(self.records_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                records[rec["key"]] = rec
+                good += len(line)
+        if good < os.path.getsize(self.records_path):
+            print(f"[checkpoint] dropping a torn record at the end of {self.records_path}")
+            with open(self.records_path, "r+b") as f:
+                f.truncate(good)
+        return records
+
+    def append(self, key: str, record: Dict[str, Any]):
+        rec = {"key": key, **record}
+        data = (json.dumps(rec, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            fd = os.open(self.records_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.records[key] = rec
+
+    def set_status(self, status: str):
+        self.manifest["status"] = status
+        self.manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+        _write_json_atomic(self.manifest_path, self.manifest)
+
+    def progress(self) -> str:
+        return f"{len(self.records)}/{self.manifest['n_items']}"
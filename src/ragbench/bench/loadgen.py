@@ -0,0 +1,159 @@
+from __future__ import annotations
+import glob
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from ragbench.utils.tracing import PERCENTILES
+
+# per-item stage timings reported by RagPipeline records
+LOAD_STAGES = ("embed_query", "retrieve", "rerank")
+
+def load_questions(pattern: str = "benchmarks/*.jsonl") -> List[str]:
+    questions = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    questions.append(json.loads(line)["question"])
+    if not questions:
+        raise FileNotFoundError(f"No benchmark questions matched {pattern}")
+    return questions
+
+
+@dataclass
+class LoadResult:
+    question: str
+    latency_ms: float  # arrival to completion; includes queueing in open-loop runs
+    service_ms: float  # time inside the pipeline call
+    error: str | None = None
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def queue_ms(self) -> float:
+        return self.latency_ms - self.service_ms
+
+
+def _call(fn: Callable[[str], Dict[str, Any]], question: str, arrived: float) -> LoadResult:
+    t0 = time.perf_counter()
+    try:
+        record = fn(question)
+        error, timings = None, dict(record.get("timings_ms") or {})
+    except Exception as e:
+        error, timings = type(e).__name__, {}
+    t1 = time.perf_counter()
+    return LoadResult(
+        question=question,
+        latency_ms=(t1 - arrived) * 1000,
+        service_ms=(t1 - t0) * 1000,
+        error=error,
+        timings_ms=timings,
+    )
+
+def run_closed_loop(
+    fn: Callable[[str], Dict[str, Any]],
+    questions: Sequence[str],
+    concurrency: int,
+    duration_s: float,
+) -> tuple[List[LoadResult], float]:
+    """
+    `concurrency` workers each issue the next question as soon as their previous one returns.
+    Throughput is whatever the pipeline sustains at that many requests in flight.
+    Returns (results, wall seconds).
+    """
+    results: List[LoadResult] = []
+    lock = threading.Lock()
+    counter = iter(range(1 << 62))
+    t_start = time.perf_counter()
+    deadline = t_start + duration_s
+
+    def worker():
+        while time.perf_counter() < deadline:
+            with lock:
+                q = questions[next(counter) % len(questions)]
+            r = _call(fn, q, time.perf_counter())
+            with lock:
+                results.append(r)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - t_start
+
+def run_open_loop(
+    fn: Callable[[str], Dict[str, Any]],
+    questions: Sequence[str],
+    rate_qps: float,
+    duration_s: float,
+    max_workers: int = 64,
+    seed: int = 0,
+) -> tuple[List[LoadResult], float]:
+    """
+    Requests arrive as a Poisson process at rate_qps regardless of how fast earlier ones finish.
+    Latency is measured from the scheduled arrival, so time spent waiting for a free worker
+    counts (no coordinated omission); past saturation the queue, and latency, keep growing.
+    Returns (results, wall seconds).
+    """
+    rng = np.random.default_rng(seed)
+    futures = []
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        arrival, i = t_start, 0
+        while True:
+            arrival += rng.exponential(1.0 / rate_qps)
+            if arrival - t_start >= duration_s:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_call, fn, questions[i % len(questions)], arrival))
+            i += 1
+        results = [f.result() for f in futures]
+    return results, time.perf_counter() - t_start
+
+
+def _percentiles(values: Sequence[float], prefix: str) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=np.float64)
+    row = {f"{prefix}_p{p}_ms": float(v) for p, v in zip(PERCENTILES, np.percentile(arr, PERCENTILES))}
+    row[f"{prefix}_max_ms"] = float(arr.max())
+    return row
+
+def summarize(results: Sequence[LoadResult], wall_s: float) -> Dict[str, Any]:
+    """
+    Throughput, error rate and latency percentiles (end-to-end, queueing and per stage).
+    """
+    ok = [r for r in results if r.error is None]
+    row: Dict[str, Any] = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "throughput_qps": len(ok) / wall_s if wall_s > 0 else 0.0,
+    }
+    row.update(_percentiles([r.latency_ms for r in ok], "latency"))
+    row.update(_percentiles([r.queue_ms for r in ok], "queue"))
+    for stage in LOAD_STAGES:
+        row.update(_percentiles([r.timings_ms[stage] for r in ok if stage in r.timings_ms], stage))
+    return row
+
+def saturation_point(levels: Sequence[float], values: Sequence[float | None], factor: float = 2.0) -> float | None:
+    """
+    First load level whose value (e.g. a stage's p99) exceeds `factor` times the value at the lightest level.
+    None if the metric never degrades that far within the sweep.
+    """
+    pairs = [(lvl, v) for lvl, v in zip(levels, values) if v is not None and not np.isnan(v)]
+    if not pairs:
+        return None
+    base = pairs[0][1]
+    for lvl, v in pairs[1:]:
+        if v > factor * base:
+            return lvl
+    return None
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import json
+import math
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_BASELINE_PATH = "results/microbench_baseline.json"
+
+@dataclass
+class MicroResult:
+    name: str
+    params: Dict[str, Any]
+    samples_ms: List[float]  # one wall time per trial
+    items: int = 1  # units of work per trial (texts, points, queries, pairs)
+
+    @property
+    def key(self) -> str:
+        return self.name + "".join(f"[{k}={v}]" for k, v in sorted(self.params.items()))
+
+    @property
+    def median_ms(self) -> float:
+        return float(np.median(self.samples_ms))
+
+    @property
+    def items_per_s(self) -> float:
+        return self.items / (self.median_ms / 1000) if self.median_ms > 0 else 0.0
+
+    def row(self) -> Dict[str, Any]:
+        arr = np.asarray(self.samples_ms)
+        return {
+            "name": self.name,
+            **self.params,
+            "trials": len(arr),
+            "median_ms": self.median_ms,
+            "mean_ms": float(arr.mean()),
+            "std_ms": float(arr.std(ddof=1)) if len(arr) > 1 else 0.0,
+            "min_ms": float(arr.min()),
+            "items_per_s": self.items_per_s,
+        }
+
+
+def measure(fn: Callable[[], Any], warmup: int = 3, trials: int = 10) -> List[float]:
+    """
+    Calls fn warmup times untimed, then returns the wall time of each of `trials` calls in ms.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(trials):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - t0) / 1e6)
+    return samples
+
+
+@dataclass
+class MicroSuite:
+    """
+    Collects MicroResults for one run; cases are registered by the caller via run().
+    """
+    warmup: int = 3
+    trials: int = 10
+    results: List[MicroResult] = field(default_factory=list)
+
+    def run(self, name: str, fn: Callable[[], Any], items: int = 1, **params) -> MicroResult:
+        r = MicroResult(name=name, params=params, samples_ms=measure(fn, self.warmup, self.trials), items=items)
+        self.results.append(r)
+        print(f"{r.key}: median {r.median_ms:.3f} ms, {r.items_per_s:,.0f} items/s")
+        return r
+
+    def save(self, path: str) -> str:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        doc = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": {"machine": platform.machine(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "warmup": self.warmup,
+            "trials": self.trials,
+            "results": [asdict(r) for r in self.results],
+        }
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=2)
+        return path
+
+
+def load_results(path: str) -> List[MicroResult]:
+    with open(path, "r") as f:
+        return [MicroResult(**r) for r in json.load(f)["results"]]
+
+
+def mann_whitney_p(slower: Sequence[float], faster: Sequence[float]) -> float:
+    """
+    One-sided Mann-Whitney U p-value for "slower tends to be larger than faster"
+    (normal approximation with tie correction). Rank based, so a few outlier trials don't dominate.
+    """
+    a, b = np.asarray(slower, dtype=np.float64), np.asarray(faster, dtype=np.float64)
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    values = np.concatenate([a, b])
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(1, len(values) + 1)
+    # average ranks over ties
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, weights=ranks) / counts)[inverse]
+
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    tie_term = ((counts ** 3 - counts).sum()) / (n * (n - 1)) if n > 1 else 0.0
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma  # continuity correction
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def compare(
+    baseline: Sequence[MicroResult],
+    current: Sequence[MicroResult],
+    alpha: float = 0.01,
+    min_slowdown: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """
+    Matches cases by name and params. A case regresses when its median is more than
+    min_slowdown slower and the slowdown is significant at alpha; both are required so
+    noise on fast cases and tiny real shifts on slow ones are not flagged.
+    """
+    base = {r.key: r for r in baseline}
+    rows = []
+    for r in current:
+        b = base.get(r.key)
+        if b is None:
+            rows.append({"case": r.key, "current_ms": r.median_ms, "status": "new"})
+            continue
+        ratio = r.median_ms / b.median_ms if b.median_ms > 0 else float("inf")
+        p_slower = mann_whitney_p(r.samples_ms, b.samples_ms)
+        p_faster = mann_whitney_p(b.samples_ms, r.samples_ms)
+        if ratio > 1 + min_slowdown and p_slower < alpha:
+            status = "REGRESSION"
+        elif ratio < 1 - min_slowdown and p_faster < alpha:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "case": r.key,
+            "baseline_ms": b.median_ms,
+            "current_ms": r.median_ms,
+            "ratio": ratio,
+            "p_value": p_slower if ratio >= 1 else p_faster,
+            "status": status,
+        })
+    return rows
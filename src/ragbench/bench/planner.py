@@ -0,0 +1,215 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import os
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from ragbench.bench.schema import BenchItem
+from ragbench.pipeline.simple_rag import RagConfig, span_ms
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.tracing import TRACER
+
+# stage -> number of grid axes its input depends on; each stage's key is a prefix of the next one's
+STAGES = {"embed": 1, "retrieve": 3, "generate": 4, "judge": 5}
+REFUSAL_ANSWER = "I don't know based on the provided context."
+# guardrail refusals are never sent to the judge: a refusal makes no claims, so it counts as faithful
+REFUSAL_VERDICT = {"faithful": True, "confidence": 1.0, "rationale": "guardrail refusal; no claims to check"}
+NO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+@dataclass(frozen=True)
+class EmbedderSpec:
+    collection: str
+    embed_kind: str
+    embed_model: str
+
+@dataclass(frozen=True)
+class GridPoint:
+    """
+    One configuration of the experiment grid. reranker=None means dense-only retrieval.
+    """
+    embedder: EmbedderSpec
+    dense_top_k: int
+    reranker: str | None
+    generator: str
+    judge: str
+
+    def key(self, stage: str) -> tuple:
+        return (self.embedder, self.dense_top_k, self.reranker, self.generator, self.judge)[:STAGES[stage]]
+
+    def rag_config(self, base: RagConfig) -> RagConfig:
+        return replace(
+            base,
+            collection=self.embedder.collection,
+            embed_kind=self.embedder.embed_kind,
+            embed_model=self.embedder.embed_model,
+            dense_top_k=self.dense_top_k,
+            use_rerank=self.reranker is not None,
+            rerank_model=self.reranker or base.rerank_model,
+        )
+
+def grid(
+    embedders: Sequence[EmbedderSpec],
+    top_ks: Sequence[int],
+    rerankers: Sequence[str | None],
+    generators: Sequence[str],
+    judges: Sequence[str],
+) -> List[GridPoint]:
+    return [GridPoint(*p) for p in itertools.product(embedders, top_ks, rerankers, generators, judges)]
+
+
+class ExperimentPlan:
+    """
+    The grid as a DAG of stages: embed -> retrieve (search + rerank) -> generate -> judge.
+    A node is a unique stage input (the grid axes the stage depends on) and holds the item
+    indices still needed by any grid point below it, so every (node, item) runs exactly once
+    and its result fans out to all dependent points. done(point, i) marks finished pairs
+    (e.g. from a checkpoint), which are pruned before planning.
+    """
+    def __init__(
+        self,
+        points: Sequence[GridPoint],
+        items: Sequence[BenchItem],
+        done: Callable[[GridPoint, int], bool] | None = None,
+    ):
+        self.points = list(points)
+        self.items = list(items)
+        self.todo: Dict[GridPoint, List[int]] = {
+            p: [i for i in range(len(self.items)) if done is None or not done(p, i)] for p in self.points
+        }
+        self.nodes: Dict[str, Dict[tuple, set]] = {stage: {} for stage in STAGES}
+        for p, todo in self.todo.items():
+            for stage in STAGES:
+                self.nodes[stage].setdefault(p.key(stage), set()).update(todo)
+
+    def calls(self) -> Dict[str, Tuple[int, int]]:
+        """
+        (planned, naive) item-level calls per stage; naive runs every grid point end to end.
+        Dense-only retrieve nodes make no reranker call but still count as retrieval.
+        """
+        return {
+            stage: (sum(len(idx) for idx in nodes.values()), sum(len(todo) for todo in self.todo.values()))
+            for stage, nodes in self.nodes.items()
+        }
+
+    def describe(self) -> str:
+        lines = [f"{len(self.points)} grid points x {len(self.items)} items", f"{'stage':<10}{'nodes':>7}{'planned':>9}{'naive':>9}"]
+        for stage, (planned, naive) in self.calls().items():
+            lines.append(f"{stage:<10}{len(self.nodes[stage]):>7}{planned:>9}{naive:>9}")
+        return "\n".join(lines)
+
+    def execute(
+        self,
+        base: RagConfig,
+        should_answer: Callable[[Dict[str, Any]], bool] | None = None,
+        concurrency: int = 8,
+        cache: LLMCache | None = None,
+        on_result: Callable[[GridPoint, int, Dict[str, Any]], None] | None = None,
+    ) -> Dict[GridPoint, Dict[int, Dict[str, Any]]]:
+        """
+        Runs the DAG stage by stage and returns {point: {item index: result}} for the pending
+        pairs, with result = {"retrieval", "answer", "judge", "usage": {"answer", "judge"}}.
+        should_answer(retrieval) is the guardrail: False returns REFUSAL_ANSWER and REFUSAL_VERDICT
+        without a generator or judge call. on_result(point, i, result) sees each pair once it is complete.
+        """
+        from ragbench.pipeline.simple_rag import RagPipeline, build_embedder, build_reranker, build_store
+
+        questions = [item.question for item in self.items]
+        retrievals: Dict[tuple, Dict[int, Dict[str, Any]]] = {}
+        for embed_key, idx in self.nodes["embed"].items():
+            if not idx:
+                continue
+            spec = embed_key[0]
+            idx = sorted(idx)
+            embedder = build_embedder(spec.embed_kind, spec.embed_model, base.embed_cache_dir)
+            with TRACER.span("embed_query", model=spec.embed_model, batch_size=len(idx)) as s_embed:
+                qvecs = dict(zip(idx, embedder.embed_queries([questions[i] for i in idx])))
+            # every retrieve node reuses these vectors and reports the same per-item embed time
+            embed_ms = span_ms(s_embed) / len(idx)
+            store = build_store(base.store_kind, spec.collection, embedder.dim, base.qdrant)
+            rerankers = {}
+            for key, r_idx in self.nodes["retrieve"].items():
+                if key[0] != spec or not r_idx:
+                    continue
+                config = GridPoint(*key, None, None).rag_config(base)
+                if key[2] is not None and key[2] not in rerankers:
+                    rerankers[key[2]] = build_reranker(config)
+                pipeline = RagPipeline(config, embedder=embedder, store=store, reranker=rerankers.get(key[2]))
+                r_idx = sorted(r_idx)
+                records = pipeline.run_batch(
+                    [questions[i] for i in r_idx], query_vectors=[qvecs[i] for i in r_idx], query_embed_ms=embed_ms,
+                )
+                retrievals[key] = dict(zip(r_idx, records))
+
+        refused = set()
+        if should_answer is not None:
+            refused = {(key, i) for key, recs in retrievals.items() for i, retr in recs.items() if not should_answer(retr)}
+        answers = self._run_llm_stage("generate", retrievals, None, refused, concurrency, cache)
+
+        # a judge node is a single grid point, so each finished judge call completes one (point, item)
+        points = {p.key("judge"): p for p in self.points}
+        out: Dict[GridPoint, Dict[int, Dict[str, Any]]] = {p: {} for p in self.points}
+
+        def finish(key, i, judged):
+            p = points[key]
+            answer, ans_usage = answers[p.key("generate")][i]
+            verdict, judge_usage = judged
+            out[p][i] = {
+                "retrieval": retrievals[p.key("retrieve")][i],
+                "answer": answer,
+                "judge": verdict,
+                "usage": {"answer": ans_usage, "judge": judge_usage},
+            }
+            if on_result is not None:
+                on_result(p, i, out[p][i])
+
+        self._run_llm_stage("judge", retrievals, answers, refused, concurrency, cache, on_done=finish)
+        return out
+
+    def _run_llm_stage(self, stage, retrievals, answers, refused, concurrency, cache, on_done=None):
+        """
+        One LLM call per pending (generate or judge node, item) with bounded concurrency;
+        (retrieve key, item) pairs in refused get the fixed refusal answer/verdict instead.
+        on_done(key, i, result) is called as each call finishes.
+        """
+        # the OpenAI SDK is only imported once there are LLM calls to make
+        from openai import AsyncOpenAI
+        from ragbench.bench.runner import run_bounded
+        from ragbench.eval.judge import judge_faithfulness_async
+        from ragbench.generation.answer import generate_answer_async
+
+        jobs = [(key, i) for key, idx in self.nodes[stage].items() for i in sorted(idx)]
+        if not jobs:
+            return {}
+
+        async def main():
+            # SDK retries off: acall_with_retries retries and traces them
+            client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+            async def one(job):
+                key, i = job
+                question, retr = self.items[i].question, retrievals[key[:3]][i]
+                if (key[:3], i) in refused:
+                    return (REFUSAL_ANSWER if stage == "generate" else REFUSAL_VERDICT), NO_USAGE
+                if stage == "generate":
+                    return await generate_answer_async(
+                        question=question, context_chunks=retr["context_chunks"], model=key[3], client=client, cache=cache,
+                    )
+                answer, _ = answers[key[:4]][i]
+                return await judge_faithfulness_async(
+                    question=question, answer=answer, context_chunks=retr["context_chunks"],
+                    model=key[4], client=client, cache=cache,
+                )
+
+            try:
+                return await run_bounded(
+                    jobs, one, concurrency=concurrency,
+                    on_result=None if on_done is None else lambda j, res: on_done(*jobs[j], res),
+                )
+            finally:
+                await client.close()
+
+        results: Dict[tuple, Dict[int, Any]] = {}
+        for (key, i), res in zip(jobs, asyncio.run(main())):
+            results.setdefault(key, {})[i] = res
+        return results
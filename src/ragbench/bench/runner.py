@@ -0,0 +1,100 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+from openai import AsyncOpenAI
+
+from ragbench.bench.schema import BenchItem
+from ragbench.generation.answer import generate_answer_async
+from ragbench.eval.judge import judge_faithfulness_async
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.tracing import TRACER
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+async def run_bounded(
+    items: Sequence[T],
+    fn: Callable[[T], Awaitable[R]],
+    concurrency: int = 8,
+    on_result: Callable[[int, R], None] | None = None,
+) -> List[R]:
+    """
+    Runs fn over items with at most `concurrency` calls in flight.
+    Results come back in the same order as items, regardless of completion order.
+    on_result(index, result) is called as each one finishes (e.g. to checkpoint it).
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, item: T) -> R:
+        async with sem:
+            result = await fn(item)
+        if on_result is not None:
+            on_result(i, result)
+        return result
+
+    return await asyncio.gather(*(one(i, it) for i, it in enumerate(items)))
+
+async def answer_and_judge(
+    question: str,
+    context_chunks: List[str],
+    answer_model: str,
+    judge_model: str,
+    client: AsyncOpenAI,
+    cache: LLMCache | None = None,
+) -> Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    with TRACER.span("answer_and_judge", answer_model=answer_model, judge_model=judge_model):
+        answer, ans_usage = await generate_answer_async(
+            question=question,
+            context_chunks=context_chunks,
+            model=answer_model,
+            client=client,
+            cache=cache,
+        )
+        verdict, judge_usage = await judge_faithfulness_async(
+            question=question,
+            answer=answer,
+            context_chunks=context_chunks,
+            model=judge_model,
+            client=client,
+            cache=cache,
+        )
+    return answer, ans_usage, verdict, judge_usage
+
+def answer_and_judge_all(
+    items: List[BenchItem],
+    retrievals: List[Dict[str, Any]],
+    answer_model: str,
+    judge_model: str,
+    concurrency: int = 8,
+    cache: LLMCache | None = None,
+    on_result: Callable[[int, Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]], None] | None = None,
+) -> List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+    """
+    Generates and judges every item with bounded concurrency.
+    Returns (answer, answer_usage, verdict, judge_usage) per item, in item order;
+    on_result(index, result) sees each item as soon as it is judged.
+    """
+    assert len(items) == len(retrievals), "items and retrievals must align"
+
+    async def main():
+        # SDK retries off: acall_with_retries retries and traces them
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        try:
+            return await run_bounded(
+                list(zip(items, retrievals)),
+                lambda pair: answer_and_judge(
+                    pair[0].question,
+                    pair[1]["context_chunks"],
+                    answer_model,
+                    judge_model,
+                    client,
+                    cache,
+                ),
+                concurrency=concurrency,
+                on_result=on_result,
+            )
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ragbench.pipeline.simple_rag import RagConfig
+
+# env knobs read by torch/MKL/OpenMP/tokenizers at import time
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) // 2)
+
+def shard_ranges(n: int, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Contiguous [start, end) ranges covering range(n), sizes differing by at most one.
+    """
+    n_shards = max(1, min(n_shards, n))
+    size, extra = divmod(n, n_shards)
+    ranges, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+# per-worker state: models are loaded once per process and shared by every task it runs
+_WORKER: Dict[str, Dict[Any, Any]] = {"stores": {}, "rerankers": {}}
+
+def _init_worker(num_threads: int):
+    # set before anything imports torch, so intra-op pools are sized once and never oversubscribe
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(num_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+
+class _ParentEmbeddings:
+    """
+    Stands in for the embedder in workers: query vectors are computed once in the parent
+    (the only process touching the on-disk embedding cache) and shipped with each shard.
+    """
+    def __init__(self, dim: int, model_name: str):
+        self.dim = dim
+        self.model_name = model_name
+
+    def embed_queries(self, texts):
+        raise RuntimeError("sharded workers only run with query vectors computed in the parent")
+
+    embed_query = embed_queries
+
+def _rerank_key(config: RagConfig) -> tuple:
+    return tuple(
+        getattr(config, f.name) for f in fields(config)
+        if f.name == "use_rerank" or f.name.startswith(("rerank_", "cascade_")) and f.name != "rerank_gate"
+    )
+
+def _pipeline(config: RagConfig, dim: int):
+    from ragbench.pipeline.simple_rag import RagPipeline, build_reranker, build_store
+
+    store_key = (config.store_kind, config.collection, config.qdrant)
+    store = _WORKER["stores"].get(store_key)
+    if store is None:
+        store = _WORKER["stores"][store_key] = build_store(config.store_kind, config.collection, dim, config.qdrant)
+
+    rerank_key = _rerank_key(config)
+    if rerank_key not in _WORKER["rerankers"]:
+        _WORKER["rerankers"][rerank_key] = build_reranker(config)
+
+    embedder = _ParentEmbeddings(dim, config.embed_model)
+    return RagPipeline(config, embedder=embedder, store=store, reranker=_WORKER["rerankers"][rerank_key])
+
+def _run_shard(config: RagConfig, questions: List[str], query_vectors: np.ndarray, embed_ms: float):
+    from ragbench.utils.tracing import TRACER
+    mark = TRACER.mark()
+    pipeline = _pipeline(config, query_vectors.shape[1])
+    records = pipeline.run_batch(questions, query_vectors=query_vectors, query_embed_ms=embed_ms)
+    return records, TRACER.since(mark)
+
+def _embed_in_parent(tasks: Sequence[Tuple[RagConfig, Sequence[str]]]) -> List[Tuple[np.ndarray, float]]:
+    """
+    (query vectors, per-item embed ms) per task. Each distinct embedder embeds its
+    distinct questions once, in this process, traced as one embed_query batch span.
+    """
+    from ragbench.pipeline.simple_rag import build_embedder, span_ms
+    from ragbench.utils.tracing import TRACER
+
+    by_embedder: Dict[tuple, Dict[str, int]] = {}
+    for config, questions in tasks:
+        index = by_embedder.setdefault((config.embed_kind, config.embed_model, config.embed_cache_dir), {})
+        for q in questions:
+            index.setdefault(q, len(index))
+
+    embedded = {}
+    for key, index in by_embedder.items():
+        embedder = build_embedder(*key)
+        with TRACER.span("embed_query", model=key[1], batch_size=len(index)) as s:
+            vectors = np.asarray(embedder.embed_queries(list(index)), dtype=np.float32)
+        embedded[key] = (index, vectors, span_ms(s) / max(len(index), 1))
+
+    out = []
+    for config, questions in tasks:
+        index, vectors, ms = embedded[(config.embed_kind, config.embed_model, config.embed_cache_dir)]
+        out.append((vectors[[index[q] for q in questions]], ms))
+    return out
+
+
+def run_sharded(
+    tasks: Sequence[Tuple[RagConfig, Sequence[str]]],
+    n_workers: int | None = None,
+    threads_per_worker: int | None = None,
+    shards_per_task: int | None = None,
+) -> List[Tuple[List[Dict[str, Any]], list]]:
+    """
+    Runs RagPipeline.run_batch for every (config, questions) task across a pool of worker
+    processes. Queries are embedded up front in this process; each task's questions are then
+    split into contiguous shards for search + rerank, and all shards of all tasks share one
+    pool, so independent configs (e.g. collections) run concurrently.
+    Returns (records, spans) per task: records in question order whatever the completion
+    order, and the worker spans to merge into the parent tracer (the embed spans are
+    already in it).
+    """
+    n_workers = n_workers or default_workers()
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // n_workers)
+    shards_per_task = shards_per_task or n_workers
+
+    embedded = _embed_in_parent(tasks)
+    jobs = []  # (task index, start, end)
+    for t, (_, questions) in enumerate(tasks):
+        for start, end in shard_ranges(len(questions), shards_per_task):
+            jobs.append((t, start, end))
+
+    out = [([None] * len(questions), []) for _, questions in tasks]
+    # spawn: workers start without the parent's torch state and threads
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads_per_worker,),
+    ) as pool:
+        futures = []
+        for t, start, end in jobs:
+            config, questions = tasks[t]
+            vectors, embed_ms = embedded[t]
+            futures.append((t, start, pool.submit(
+                _run_shard, config, list(questions[start:end]), vectors[start:end], embed_ms,
+            )))
+        for t, start, fut in futures:
+            records, spans = fut.result()
+            out[t][0][start:start + len(records)] = records
+            out[t][1].extend(spans)
+    return out
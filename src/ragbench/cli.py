@@ -0,0 +1,264 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Sequence
+
+# Only the stdlib is imported at startup; each command imports what it needs, so --help
+# and the summary commands never load these (guarded by `ragbench import-time`).
+HEAVY_MODULES = ("numpy", "openai", "torch", "sentence_transformers", "transformers", "qdrant_client")
+IMPORT_TIME_BUDGET_MS = 200.0
+DEFAULT_RESULTS_DIR = "results/store"  # ragbench.utils.results_store.DEFAULT_RESULTS_DIR, kept import-free
+STAGE_PERCENTILES = (50, 90, 99)
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    # inclusive method matches numpy's default linear interpolation
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    row = {f"p{p}": cuts[p - 1] for p in STAGE_PERCENTILES}
+    row["max"] = values[-1]
+    return row
+
+def _print_table(rows: List[Dict[str, object]]):
+    if not rows:
+        return
+    cols = list(dict.fromkeys(k for r in rows for k in r))
+    cells = [[f"{r.get(c, ''):.3f}" if isinstance(r.get(c), float) else str(r.get(c, "")) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(cols)]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for row in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+TIMING_STAGES = ("embed_query", "retrieve", "rerank", "total_retrieval")
+
+def _items_from_jsonl(path: str) -> List[Dict[str, object]]:
+    from ragbench.eval.refusal import is_refusal
+
+    items = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            usage = r.get("usage") or {}
+            items.append({
+                "answerable": r.get("gold_answer") is not None,
+                "faithful": bool((r.get("judge") or {}).get("faithful", False)),
+                "refused": is_refusal(r["answer"]),
+                "timings": r.get("retrieval", {}).get("timings_ms", {}),
+                "tokens": sum((u or {}).get("total_tokens", 0) for u in usage.values()),
+            })
+    return items
+
+def _items_from_store(run_id: str, root: str, variant: str | None = None) -> List[Dict[str, object]]:
+    import pyarrow.dataset as ds
+    from ragbench.utils.results_store import ResultsStore
+
+    filter = ds.field("run_id") == run_id
+    if variant is not None:
+        filter &= ds.field("variant") == variant
+    table = ResultsStore(root).scan(
+        columns=["gold_answer", "faithful", "refused", "timings", "answer_tokens", "judge_tokens"],
+        filter=filter,
+    )
+    keys = {"embed_query": "embed_query_ms", "retrieve": "retrieve_ms", "rerank": "rerank_ms", "total_retrieval": "total_ms"}
+    return [
+        {
+            "answerable": r["gold_answer"] is not None,
+            "faithful": bool(r["faithful"]),
+            "refused": bool(r["refused"]),
+            "timings": {stage: r["timings"][col] for stage, col in keys.items()},
+            "tokens": (r["answer_tokens"] or 0) + (r["judge_tokens"] or 0),
+        }
+        for r in table.to_pylist()
+    ]
+
+def cmd_summarize(args):
+    """
+    Headline metrics of a run: a run id in the results store, or a legacy bench_runs_*.jsonl file.
+    """
+    if args.run.endswith(".jsonl") and os.path.exists(args.run):
+        items = _items_from_jsonl(args.run)
+    else:
+        items = _items_from_store(args.run, args.results_dir, args.variant)
+    if not items:
+        sys.exit(f"{args.run}: no records")
+
+    answerable = [r for r in items if r["answerable"]]
+    unanswerable = [r for r in items if not r["answerable"]]
+    rows = [
+        {"metric": "items", "value": float(len(items))},
+        {"metric": "faithfulness_rate", "value": float(statistics.mean(r["faithful"] for r in items))},
+    ]
+    if answerable:
+        rows.append({"metric": "answer_success_rate", "value": float(statistics.mean(
+            (not r["refused"]) and r["faithful"] for r in answerable
+        ))})
+        rows.append({"metric": "false_refusal_rate", "value": float(statistics.mean(r["refused"] for r in answerable))})
+    if unanswerable:
+        rows.append({"metric": "hallucination_rate", "value": float(statistics.mean(
+            not r["refused"] for r in unanswerable
+        ))})
+
+    for stage in TIMING_STAGES:
+        values = [r["timings"][stage] for r in items if stage in r["timings"]]
+        for k, v in _percentiles(values).items():
+            rows.append({"metric": f"{stage}_{k}_ms", "value": float(v)})
+    rows.append({"metric": "llm_total_tokens", "value": float(sum(r["tokens"] for r in items))})
+    _print_table(rows)
+
+def cmd_runs(args):
+    from ragbench.utils.results_store import ResultsStore
+    runs = ResultsStore(args.results_dir).runs()
+    _print_table([{k: r[k] for k in ("run_id", "created", "script")} for r in runs.to_pylist()[-args.last:]])
+
+def cmd_traces(args):
+    """
+    Per-stage p50/p90/p99/max of a results/traces_*.otlp.json export.
+    Batch spans are divided by their batch_size and cache hits are left out,
+    as in tracing.stage_percentiles.
+    """
+    with open(args.path, "r") as f:
+        doc = json.load(f)
+
+    by_stage: Dict[str, List[float]] = {}
+    for rs in doc.get("resourceSpans", []):
+        for ss in rs.get("scopeSpans", []):
+            for s in ss.get("spans", []):
+                attrs = {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])}
+                if attrs.get("cached") is True:
+                    continue
+                ms = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+                by_stage.setdefault(s["name"], []).append(ms / max(int(attrs.get("batch_size", 1)), 1))
+
+    rows = [
+        {"stage": name, "count": len(values), **_percentiles(values)}
+        for name, values in sorted(by_stage.items())
+        if not args.stages or name in args.stages
+    ]
+    _print_table(rows)
+
+def cmd_query(args):
+    from ragbench.pipeline.simple_rag import RagConfig, RagPipeline
+
+    config = RagConfig(
+        collection=args.collection,
+        embed_kind=args.embed_kind,
+        embed_model=args.embed_model,
+        embed_cache_dir=args.embed_cache_dir,
+        store_kind=args.store,
+        dense_top_k=args.top_k,
+        use_rerank=not args.no_rerank,
+        rerank_model=args.rerank_model,
+        rerank_top_n=args.rerank_top_n,
+        rerank_backend=args.rerank_backend,
+        retrieval_mode=args.retrieval_mode,
+    )
+    embedder = None
+    if args.mock_embed:
+        from ragbench.embed.mock_provider import MockEmbeddingProvider
+        # never builds the real embedder: no model load, no API key
+        embedder = MockEmbeddingProvider(args.dim)
+    record = RagPipeline(config, embedder=embedder).run(args.question)
+    if args.json:
+        print(json.dumps(record, ensure_ascii=False, indent=2, default=str))
+        return
+    for i, chunk in enumerate(record["context_chunks"], 1):
+        print(f"[{i}] {chunk}")
+    print(", ".join(f"{k}={v:.1f}ms" for k, v in record["timings_ms"].items()))
+
+def _probe(code: str) -> tuple[float, List[str]]:
+    """
+    Runs code in a fresh interpreter; returns (wall ms, heavy modules it left loaded).
+    """
+    script = (
+        "import sys, time\n"
+        "t0 = time.perf_counter()\n"
+        f"{code}\n"
+        "ms = (time.perf_counter() - t0) * 1000\n"
+        f"print(ms, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    ms, _, loaded = out.stdout.strip().splitlines()[-1].partition(" ")
+    return float(ms), [m for m in loaded.split(",") if m]
+
+def cmd_import_time(args):
+    """
+    Cold-start guard: `ragbench --help` must stay under the budget without loading any heavy
+    backend, and importing the pipeline must not load openai, torch or qdrant_client. Exits 1 on failure.
+    """
+    help_code = (
+        "import contextlib, io\n"
+        "from ragbench.cli import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit): main(['--help'])"
+    )
+    runs = [_probe(help_code) for _ in range(args.repeat)]
+    help_ms = statistics.median(ms for ms, _ in runs)
+    help_loaded = runs[0][1]
+    pipeline_ms, pipeline_loaded = _probe("import ragbench.pipeline.simple_rag")
+    pipeline_loaded = [m for m in pipeline_loaded if m != "numpy"]
+
+    print(f"ragbench --help: {help_ms:.1f} ms excluding interpreter startup (median of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    print(f"  heavy modules loaded: {', '.join(help_loaded) or 'none'}")
+    print(f"import ragbench.pipeline.simple_rag: {pipeline_ms:.1f} ms")
+    print(f"  backends loaded: {', '.join(pipeline_loaded) or 'none'}")
+    if help_ms > args.budget_ms or help_loaded or pipeline_loaded:
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ragbench", description="RAG benchmarking toolkit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("summarize", help="headline metrics of a stored run (or a bench_runs_*.jsonl file)")
+    p.add_argument("run", help="run id in the results store, or a .jsonl path")
+    p.add_argument("--variant", help="only this configuration of a multi-config run (e.g. a generator model)")
+    p.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    p.set_defaults(func=cmd_summarize)
+
+    p = sub.add_parser("runs", help="list runs in the results store")
+    p.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    p.add_argument("--last", type=int, default=20)
+    p.set_defaults(func=cmd_runs)
+
+    p = sub.add_parser("traces", help="per-stage latency percentiles of a traces_*.otlp.json file")
+    p.add_argument("path")
+    p.add_argument("--stages", nargs="+", help="only these span names")
+    p.set_defaults(func=cmd_traces)
+
+    p = sub.add_parser("query", help="run retrieval (and rerank) for one question")
+    p.add_argument("question")
+    p.add_argument("--collection", required=True)
+    p.add_argument("--embed-kind", choices=["openai", "local"], default="openai")
+    p.add_argument("--embed-model", default="text-embedding-3-small")
+    p.add_argument("--embed-cache-dir")
+    p.add_argument("--mock-embed", action="store_true", help="deterministic local vectors instead of the embedder")
+    p.add_argument("--dim", type=int, default=1536, help="--mock-embed vector size (= the collection's vector size)")
+    p.add_argument("--store", choices=["qdrant", "numpy"], default="qdrant")
+    p.add_argument("--retrieval-mode", choices=["dense", "hybrid"], default="dense")
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--no-rerank", action="store_true")
+    p.add_argument("--rerank-model", default="BAAI/bge-reranker-base")
+    p.add_argument("--rerank-backend", choices=["torch", "onnx", "onnx-int8"], default="torch")
+    p.add_argument("--rerank-top-n", type=int, default=3)
+    p.add_argument("--json", action="store_true", help="print the full run record")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("import-time", help="check cold-start time and lazy imports (exit 1 over budget)")
+    p.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_import_time)
+    return parser
+
+def main(argv: List[str] | None = None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
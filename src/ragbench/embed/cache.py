@@ -0,0 +1,212 @@
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = ".cache/embeddings"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache for one provider/model.
+    SQLite maps text hash -> row slot; vectors live in a memory-mapped float32 matrix.
+    Bounded to max_entries rows, least recently used rows are evicted first.
+    """
+    def __init__(self, namespace: str, dim: int, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 1_000_000):
+        self.namespace = namespace
+        self.dim = dim
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        key = hashlib.sha1(f"{namespace}|{dim}".encode("utf-8")).hexdigest()[:16]
+        self.db_path = os.path.join(cache_dir, f"{key}.sqlite")
+        self.matrix_path = os.path.join(cache_dir, f"{key}.f32")
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "text_hash TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('namespace', ?)", (namespace,))
+        self._db.commit()
+
+        self._mm = None
+        self._capacity = 0
+        if os.path.exists(self.matrix_path):
+            rows = os.path.getsize(self.matrix_path) // (4 * dim)
+            if rows:
+                self._open_matrix(rows)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _open_matrix(self, rows: int):
+        if self._mm is not None:
+            self._mm.flush()
+            del self._mm
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(rows * self.dim * 4)
+        self._mm = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+        self._capacity = rows
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_rows = min(max(rows, 2 * self._capacity, 1024), max(rows, self.max_entries))
+        self._open_matrix(new_rows)
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        if not hashes:
+            return found
+        with self._lock:
+            now = time.time()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT text_hash, slot FROM entries WHERE text_hash IN ({marks})", chunk
+                ).fetchall()
+                for h, slot in rows:
+                    found[h] = np.array(self._mm[slot])
+                if rows:
+                    self._db.executemany(
+                        "UPDATE entries SET last_used = ? WHERE text_hash = ?",
+                        [(now, h) for h, _ in rows],
+                    )
+            self._db.commit()
+            self.hits += len(found)
+            self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, hashes: List[str], vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        assert vectors.shape == (len(hashes), self.dim), "vectors must be (n, dim)"
+        with self._lock:
+            now = time.time()
+            existing = set()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                existing.update(h for (h,) in self._db.execute(
+                    f"SELECT text_hash FROM entries WHERE text_hash IN ({marks})", chunk
+                ))
+            new = [(h, v) for h, v in zip(hashes, vectors) if h not in existing]
+            # never keep more than max_entries; the tail of an oversized batch is simply not cached
+            new = new[:self.max_entries]
+
+            n_used = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            overflow = max(0, n_used + len(new) - self.max_entries)
+            free_slots = []
+            if overflow:
+                victims = self._db.execute(
+                    "SELECT text_hash, slot FROM entries ORDER BY last_used ASC LIMIT ?", (overflow,)
+                ).fetchall()
+                self._db.executemany("DELETE FROM entries WHERE text_hash = ?", [(h,) for h, _ in victims])
+                free_slots = [slot for _, slot in victims]
+                self.evictions += len(victims)
+
+            next_slot = self._db.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+            next_slot = max(next_slot, max(free_slots) + 1 if free_slots else 0)
+            slots = free_slots + list(range(next_slot, next_slot + len(new) - len(free_slots)))
+            if slots:
+                self._ensure_capacity(max(slots) + 1)
+
+            for (h, v), slot in zip(new, slots):
+                self._mm[slot] = v
+            if self._mm is not None:
+                self._mm.flush()
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (text_hash, slot, last_used) VALUES (?, ?, ?)",
+                [(h, slot, now) for (h, _), slot in zip(new, slots)],
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+            self._db.close()
+
+
+class CachedEmbeddingProvider:
+    """
+    Wraps any embedding provider; only texts missing from the cache reach the provider.
+    """
+    def __init__(self, provider, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 1_000_000):
+        self.provider = provider
+        self.name = getattr(provider, "name", None) or getattr(provider, "model_name")
+        self.dim = provider.dim
+        self.cache = EmbeddingCache(self.name, self.dim, cache_dir=cache_dir, max_entries=max_entries)
+
+    def __getattr__(self, attr):
+        # model, model_name, client, ... come from the wrapped provider
+        if attr == "provider":
+            raise AttributeError(attr)
+        return getattr(self.provider, attr)
+
+    def _embed_cached(self, texts: List[str], embed_fn) -> np.ndarray:
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(hashes)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+
+        if missing:
+            vecs = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+            self.cache.put_many(list(missing.keys()), vecs)
+            for h, v in zip(missing.keys(), vecs):
+                found[h] = v
+
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            out[i] = found[h]
+        return out
+
+    def _doc_fn(self):
+        if hasattr(self.provider, "embed_documents"):
+            return self.provider.embed_documents
+        return self.provider.embed_texts
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self._embed_cached(texts, self._doc_fn())
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self._embed_cached(texts, self._doc_fn())
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self._embed_cached(texts, self.provider.embed_queries)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_queries([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
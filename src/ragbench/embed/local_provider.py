@@ -1,14 +1,20 @@
 from typing import List
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 class LocalSTEmbeddingProvider:
     def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
         self.model_name = model_name
+        self.name = f"st:{model_name}"
         self.model = SentenceTransformer(model_name)
         self.dim = self.model.get_sentence_embedding_dimension()
 
-    def embed_documents(self, texts: List[str]):
-        return self.model.encode(texts, normalize_embeddings=True).tolist()
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vecs = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vecs.astype(np.float32, copy=False)
 
-    def embed_query(self, text: str):
-        return self.model.encode([text], normalize_embeddings=True)[0].tolist()
\ No newline at end of file
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.embed_documents(texts)
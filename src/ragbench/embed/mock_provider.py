@@ -0,0 +1,38 @@
+import hashlib
+import time
+from typing import List
+
+import numpy as np
+
+class MockEmbeddingProvider:
+    """
+    Deterministic stand-in for an embedding API: unit vectors seeded by a text hash,
+    with an optional fixed per-call latency. Lets load tests measure retrieval and
+    rerank capacity without paying for (or being rate limited by) a real provider.
+    """
+    def __init__(self, dim: int, latency_ms: float = 0.0, name: str = "mock"):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.name = f"{name}:{dim}"
+        self.model_name = self.name
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return v / np.linalg.norm(v)
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._vector(t) for t in texts])
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self.embed_texts(texts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.embed_texts(texts)
@@ -1,41 +1,112 @@
 from __future__ import annotations
 from typing import List, Protocol
 import os
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 from dotenv import load_dotenv
 
+from ragbench.utils.retry import call_with_retries
+
 load_dotenv()
 
 class EmbeddingProvider(Protocol):
     name: str
     dim: int
-    def embed_texts(self, texts: List[str]) -> List[List[float]]: ...
-    def embed_query(self, text: str) -> List[float]: ...
+    def embed_texts(self, texts: List[str]) -> np.ndarray: ...
+    def embed_query(self, text: str) -> np.ndarray: ...
+    def embed_queries(self, texts: List[str]) -> np.ndarray: ...
+
+
+# per-request limits of the embeddings endpoint
+OPENAI_MAX_BATCH_INPUTS = 2048
+OPENAI_MAX_BATCH_TOKENS = 300_000
+
 
 
 class OpenAIEmbeddingProvider:
     """
     Uses OpenAI embeddings. Good baseline: strong quality, stable.
+    Inputs are split into token-aware batches that are sent concurrently.
     """
-    def __init__(self, model: str = "text-embedding-3-small"):
-        
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        max_batch_inputs: int = OPENAI_MAX_BATCH_INPUTS,
+        max_batch_tokens: int = OPENAI_MAX_BATCH_TOKENS,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+    ):
+        import tiktoken
+        from openai import OpenAI
+
+        # retries are handled per batch below, so a failure only re-sends that batch
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
         self.model = model
         self.name = f"openai:{model}"
         # dims: 1536 for text-embedding-3-small, 3072 for -3-large
         self.dim = 1536 if model.endswith("3-small") else 3072
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        resp = self.client.embeddings.create(model=self.model, input=texts)
-        return [d.embedding for d in resp.data]
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Greedy split into lists of indices, each under the input-count and token limits.
+        """
+        batches, cur, cur_tokens = [], [], 0
+        for i, n_tok in enumerate(len(t) for t in self.encoding.encode_batch(texts, disallowed_special=())):
+            if cur and (len(cur) >= self.max_batch_inputs or cur_tokens + n_tok > self.max_batch_tokens):
+                batches.append(cur)
+                cur, cur_tokens = [], 0
+            cur.append(i)
+            cur_tokens += n_tok
+        if cur:
+            batches.append(cur)
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        # base64 payload decodes straight into float32, no per-float Python objects
+        resp = call_with_retries(
+            lambda: self.client.embeddings.create(model=self.model, input=texts, encoding_format="base64"),
+            stage="embed",
+            max_retries=self.max_retries,
+        )
+        data = sorted(resp.data, key=lambda d: d.index)
+        return np.stack([np.frombuffer(base64.b64decode(d.embedding), dtype=np.float32) for d in data])
 
-    def embed_query(self, text: str) -> List[float]:
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        batches = self.make_batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch(texts)
+
+        out = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            results = pool.map(self._embed_batch, [[texts[i] for i in b] for b in batches])
+            for idxs, vecs in zip(batches, results):
+                if out is None:
+                    out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+                out[idxs] = vecs
+        return out
+
+    def embed_query(self, text: str) -> np.ndarray:
         return self.embed_texts([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.embed_texts(texts)
     
-    def embed_documents(self, texts):
-        return [self.embed_query(t) for t in texts]
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self.embed_texts(texts)
 
 
 class SentenceTransformerProvider:
@@ -43,15 +114,18 @@ class SentenceTransformerProvider:
     Open-source embeddings. Great for reproducibility + cost-free runs.
     """
     def __init__(self, model: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        
+        from sentence_transformers import SentenceTransformer
         self.model_name = model
         self.model = SentenceTransformer(model)
         self.name = f"st:{model}"
         self.dim = self.model.get_sentence_embedding_dimension()
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        vecs = self.model.encode(texts, normalize_embeddings=True).tolist()
-        return vecs
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        vecs = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vecs.astype(np.float32, copy=False)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])[0]
 
-    def embed_query(self, text: str) -> List[float]:
-        return self.embed_texts([text])[0]
\ No newline at end of file
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.embed_texts(texts)
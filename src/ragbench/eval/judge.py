@@ -2,7 +2,11 @@ import os
 import json
 from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.retry import call_with_retries, acall_with_retries
+from ragbench.utils.tracing import TRACER
 
 load_dotenv()
 
@@ -17,34 +21,86 @@ confidence (0-1),
 rationale (string, <= 25 words).
 """
 
+def build_judge_messages(question: str, answer: str, context_chunks: List[str]) -> List[Dict[str, str]]:
+    context = "\n\n".join([f"[chunk_{i}] {c}" for i, c in enumerate(context_chunks)])
+    return [
+        {"role": "system", "content": JUDGE_SYSTEM},
+        {
+            "role": "user",
+            "content": json.dumps({
+                "question": question,
+                "context": context,
+                "answer": answer
+            })
+        },
+    ]
+
 def judge_faithfulness(
     question: str,
     answer: str,
     context_chunks: List[str],
     model: str = "gpt-4.1-mini",
+    cache: LLMCache | None = None,
 ):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    with TRACER.span("judge", model=model) as span:
+        if cache is not None:
+            key = LLMCache.make_key("judge", model, JUDGE_SYSTEM, question, context_chunks, answer)
+            hit = cache.get(key)
+            span.attributes["cached"] = hit is not None
+            if hit is not None:
+                return hit
 
-    context = "\n\n".join([f"[chunk_{i}] {c}" for i, c in enumerate(context_chunks)])
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+        resp = call_with_retries(
+            lambda: client.chat.completions.create(
+                model=model,
+                temperature=0,
+                response_format={"type": "json_object"},  # 🔥 critical
+                messages=build_judge_messages(question, answer, context_chunks),
+            ),
+            stage="judge",
+        )
+
+        verdict = json.loads(resp.choices[0].message.content)
+        usage = resp.usage.model_dump() if resp.usage else {}
+        if cache is not None:
+            cache.put(key, "judge", model, verdict, usage)
+        return verdict, usage
+
+async def judge_faithfulness_async(
+    question: str,
+    answer: str,
+    context_chunks: List[str],
+    model: str = "gpt-4.1-mini",
+    client: AsyncOpenAI | None = None,
+    cache: LLMCache | None = None,
+):
+    """
+    Async variant of judge_faithfulness. Pass a shared AsyncOpenAI client to reuse connections.
+    """
+    with TRACER.span("judge", model=model) as span:
+        if cache is not None:
+            key = LLMCache.make_key("judge", model, JUDGE_SYSTEM, question, context_chunks, answer)
+            hit = cache.get(key)
+            span.attributes["cached"] = hit is not None
+            if hit is not None:
+                return hit
+
+        client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0,
-        response_format={"type": "json_object"},  # 🔥 critical
-        messages=[
-            {"role": "system", "content": JUDGE_SYSTEM},
-            {
-                "role": "user",
-                "content": json.dumps({
-                    "question": question,
-                    "context": context,
-                    "answer": answer
-                })
-            },
-        ],
-    )
-
-    verdict = json.loads(resp.choices[0].message.content)
-    usage = resp.usage.model_dump() if resp.usage else {}
-    return verdict, usage
+        resp = await acall_with_retries(
+            lambda: client.chat.completions.create(
+                model=model,
+                temperature=0,
+                response_format={"type": "json_object"},
+                messages=build_judge_messages(question, answer, context_chunks),
+            ),
+            stage="judge",
+        )
 
+        verdict = json.loads(resp.choices[0].message.content)
+        usage = resp.usage.model_dump() if resp.usage else {}
+        if cache is not None:
+            cache.put(key, "judge", model, verdict, usage)
+        return verdict, usage
@@ -0,0 +1,27 @@
+from typing import Sequence
+
+import numpy as np
+
+def kendall_tau(a: Sequence[float], b: Sequence[float]) -> float:
+    """
+    Kendall tau-a between two score lists over the same items (1 = same order).
+    """
+    x = np.asarray(a, dtype=np.float64)
+    y = np.asarray(b, dtype=np.float64)
+    n = len(x)
+    if n < 2:
+        return 1.0
+    iu = np.triu_indices(n, k=1)
+    dx = np.sign(x[:, None] - x[None, :])[iu]
+    dy = np.sign(y[:, None] - y[None, :])[iu]
+    return float((dx * dy).sum() / len(dx))
+
+def top_n_overlap(a: Sequence[float], b: Sequence[float], n: int) -> float:
+    """
+    Fraction of the top-n items (by score) shared between two score lists.
+    """
+    if n <= 0 or len(a) == 0:
+        return 1.0
+    top_a = set(np.argsort(-np.asarray(a), kind="stable")[:n].tolist())
+    top_b = set(np.argsort(-np.asarray(b), kind="stable")[:n].tolist())
+    return len(top_a & top_b) / min(n, len(a))
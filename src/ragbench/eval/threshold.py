@@ -0,0 +1,54 @@
+from typing import Dict
+
+import numpy as np
+
+def evaluate_tau_grid(
+    top_dense: np.ndarray,
+    top_rerank: np.ndarray,
+    faithful: np.ndarray,
+    refused: np.ndarray,
+    answerable: np.ndarray,
+    tau_dense: np.ndarray,
+    tau_rerank: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Gate metrics for every (tau_dense, tau_rerank) pair from per-item arrays.
+
+    Items are answered iff top_dense >= tau_dense and top_rerank >= tau_rerank;
+    gated items count as a faithful refusal. Each metric is a sum over items of
+    dense_ok * rerank_ok * weight, i.e. one (Td, n) @ (n, Tr) matmul, so the grid
+    never materialises a (Td, Tr, n) tensor.
+    Returns (len(tau_dense), len(tau_rerank)) arrays.
+    """
+    top_dense = np.asarray(top_dense, dtype=np.float64)
+    top_rerank = np.asarray(top_rerank, dtype=np.float64)
+    faithful = np.asarray(faithful, dtype=np.float64)
+    refused = np.asarray(refused, dtype=np.float64)
+    answerable = np.asarray(answerable, dtype=np.float64)
+    unanswerable = 1.0 - answerable
+
+    dense_ok = (top_dense[None, :] >= np.asarray(tau_dense)[:, None]).astype(np.float64)    # (Td, n)
+    rerank_ok = (top_rerank[None, :] >= np.asarray(tau_rerank)[:, None]).astype(np.float64)  # (Tr, n)
+
+    def answered_sum(weight: np.ndarray) -> np.ndarray:
+        return (dense_ok * weight) @ rerank_ok.T
+
+    n = len(top_dense)
+    n_ans = answerable.sum()
+    n_unans = unanswerable.sum()
+    not_refused = 1.0 - refused
+
+    unfaithful_answered = answered_sum(1.0 - faithful)
+    success = answered_sum(answerable * not_refused * faithful)
+    answered_answerable = answered_sum(answerable * not_refused)
+    hallucinated = answered_sum(unanswerable * not_refused)
+
+    def rate(num, den):
+        return num / den if den else np.zeros_like(num)
+
+    return {
+        "faithfulness_rate": rate(n - unfaithful_answered, n),
+        "answer_success_rate": rate(success, n_ans),
+        "false_refusal_rate": rate(n_ans - answered_answerable, n_ans),
+        "hallucination_rate": rate(hallucinated, n_unans),
+    }
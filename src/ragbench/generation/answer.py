@@ -2,7 +2,11 @@ import os
 import json
 from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+from ragbench.utils.llm_cache import LLMCache
+from ragbench.utils.retry import call_with_retries, acall_with_retries
+from ragbench.utils.tracing import TRACER
 
 load_dotenv()
 
@@ -18,24 +22,76 @@ Keep answers concise.
 Cite sources as [chunk_i].
 """
 
+def build_messages(question: str, context_chunks: List[str]) -> List[Dict[str, str]]:
+    context = "\n\n".join([f"[chunk_{i}] {c}" for i, c in enumerate(context_chunks)])
+    return [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": json.dumps({"question": question, "context": context})},
+    ]
+
 def generate_answer(
     question: str,
     context_chunks: List[str],
     model: str = "gpt-4.1-mini",
+    cache: LLMCache | None = None,
 ) -> Tuple[str, Dict[str, Any]]:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    with TRACER.span("generate", model=model) as span:
+        if cache is not None:
+            key = LLMCache.make_key("answer", model, SYSTEM, question, context_chunks)
+            hit = cache.get(key)
+            span.attributes["cached"] = hit is not None
+            if hit is not None:
+                return hit
 
-    context = "\n\n".join([f"[chunk_{i}] {c}" for i, c in enumerate(context_chunks)])
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+        resp = call_with_retries(
+            lambda: client.chat.completions.create(
+                model=model,
+                temperature=0,
+                messages=build_messages(question, context_chunks),
+            ),
+            stage="generate",
+        )
+
+        answer = resp.choices[0].message.content
+        usage = resp.usage.model_dump() if resp.usage else {}
+        if cache is not None:
+            cache.put(key, "answer", model, answer, usage)
+        return answer, usage
+
+async def generate_answer_async(
+    question: str,
+    context_chunks: List[str],
+    model: str = "gpt-4.1-mini",
+    client: AsyncOpenAI | None = None,
+    cache: LLMCache | None = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Async variant of generate_answer. Pass a shared AsyncOpenAI client to reuse connections
+    (created with max_retries=0, so retries are traced here rather than hidden in the SDK).
+    """
+    with TRACER.span("generate", model=model) as span:
+        if cache is not None:
+            key = LLMCache.make_key("answer", model, SYSTEM, question, context_chunks)
+            hit = cache.get(key)
+            span.attributes["cached"] = hit is not None
+            if hit is not None:
+                return hit
+
+        client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+        resp = await acall_with_retries(
+            lambda: client.chat.completions.create(
+                model=model,
+                temperature=0,
+                messages=build_messages(question, context_chunks),
+            ),
+            stage="generate",
+        )
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0,
-        messages=[
-            {"role": "system", "content": SYSTEM},
-            {"role": "user", "content": json.dumps({"question": question, "context": context})},
-        ],
-    )
-
-    answer = resp.choices[0].message.content
-    usage = resp.usage.model_dump() if resp.usage else {}
-    return answer, usage
\ No newline at end of file
+        answer = resp.choices[0].message.content
+        usage = resp.usage.model_dump() if resp.usage else {}
+        if cache is not None:
+            cache.put(key, "answer", model, answer, usage)
+        return answer, usage
@@ -0,0 +1,308 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+DEFAULT_CHECKPOINT_DIR = ".cache/ingest"
+FINGERPRINT_HEAD_BYTES = 1 << 20
+
+_DONE = object()
+
+
+@dataclass
+class Batch:
+    index: int
+    start_doc: int          # docs ingested before this batch
+    end_offset: int         # byte offset just past the batch's last line
+    texts: List[str]
+    payloads: List[Dict[str, Any]]
+    vectors: Optional[np.ndarray] = None
+
+
+@dataclass
+class StageStats:
+    name: str
+    docs: int = 0
+    busy_s: float = 0.0
+
+    @property
+    def docs_per_s(self) -> float:
+        return self.docs / self.busy_s if self.busy_s else 0.0
+
+
+def corpus_fingerprint(path: str) -> Dict[str, Any]:
+    """
+    Size, mtime and a hash of the first MiB: enough to tell that a byte offset into
+    the file is no longer valid (edited, regenerated or appended to).
+    """
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        head = hashlib.sha256(f.read(FINGERPRINT_HEAD_BYTES)).hexdigest()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "head_sha256": head}
+
+
+@dataclass
+class IngestCheckpoint:
+    corpus_path: str
+    collection: str
+    offset: int = 0
+    n_docs: int = 0
+    n_batches: int = 0
+    fingerprint: Optional[Dict[str, Any]] = None
+    complete: bool = False  # set when a run reached the end of the corpus
+
+    def resumable(self, corpus_path: str) -> Optional[str]:
+        """
+        None if this checkpoint can be continued on corpus_path, else the reason it can't.
+        """
+        if self.corpus_path != os.path.abspath(corpus_path):
+            return "different corpus"
+        if self.complete:
+            return "previous run completed"
+        if self.fingerprint != corpus_fingerprint(corpus_path):
+            return "corpus changed since the checkpoint"
+        return None
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IngestCheckpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str):
+        # write-then-rename so a crash never leaves a half-written checkpoint
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.__dict__, f)
+        os.replace(tmp, path)
+
+
+def default_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {"text": row["text"], "source": row.get("source", "unknown"), "doc_id": row.get("id")}
+
+
+class IngestPipeline:
+    """
+    Streams a JSONL corpus through bounded-queue stages: read+batch -> embed -> upsert.
+    Each stage runs in its own thread, so embedding batch i+1 overlaps with upserting
+    batch i, and at most queue_size batches are ever held in memory.
+
+    Every checkpoint_every upserted batches (and when the run ends) the store is flushed
+    and the byte offset of the corpus is checkpointed; a rerun with resume=True seeks
+    there and continues.
+    """
+    def __init__(
+        self,
+        embedder,
+        store,
+        batch_size: int = 256,
+        queue_size: int = 4,
+        checkpoint_every: int = 16,
+        checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+        make_payload: Callable[[Dict[str, Any]], Dict[str, Any]] = default_payload,
+        payload_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        sparse_index=None,
+    ):
+        self.embedder = embedder
+        self.store = store
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_dir = checkpoint_dir
+        self.make_payload = make_payload
+        # rows whose payload fails the filter are read but not embedded/upserted
+        self.payload_filter = payload_filter
+        # optional BM25Index fed with the same batches; saved with every checkpoint
+        self.sparse_index = sparse_index
+
+        self.stats = {name: StageStats(name) for name in ("read", "embed", "upsert")}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.checkpoint_dir, f"{self.store.collection_name}.json")
+
+    def can_resume(self, corpus_path: str) -> bool:
+        ckpt = IngestCheckpoint.load(self.checkpoint_path())
+        return ckpt is not None and ckpt.resumable(corpus_path) is None
+
+    def _put(self, q: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _read_batches(self, path: str, ckpt: IngestCheckpoint) -> Iterator[Batch]:
+        index, doc = ckpt.n_batches, ckpt.n_docs
+        texts: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        with open(path, "rb") as f:
+            f.seek(ckpt.offset)
+            for line in iter(f.readline, b""):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                payload = self.make_payload(row)
+                if self.payload_filter is not None and not self.payload_filter(payload):
+                    continue
+                texts.append(row["text"])
+                payloads.append(payload)
+                if len(texts) == self.batch_size:
+                    yield Batch(index, doc, f.tell(), texts, payloads)
+                    index, doc = index + 1, doc + len(texts)
+                    texts, payloads = [], []
+            if texts:
+                yield Batch(index, doc, f.tell(), texts, payloads)
+
+    def _reader(self, path: str, ckpt: IngestCheckpoint, q_out: queue.Queue):
+        stats = self.stats["read"]
+        try:
+            batches = self._read_batches(path, ckpt)
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                batch = next(batches, None)
+                stats.busy_s += time.perf_counter() - t0
+                if batch is None:
+                    break
+                stats.docs += len(batch.texts)
+                self._put(q_out, batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(q_out, _DONE)
+
+    def _embed(self, q_in: queue.Queue, q_out: queue.Queue):
+        stats = self.stats["embed"]
+        try:
+            while True:
+                batch = self._get(q_in)
+                if batch is _DONE:
+                    break
+                t0 = time.perf_counter()
+                batch.vectors = np.asarray(self.embedder.embed_documents(batch.texts), dtype=np.float32)
+                stats.busy_s += time.perf_counter() - t0
+                stats.docs += len(batch.texts)
+                self._put(q_out, batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(q_out, _DONE)
+
+    def _upsert(self, q_in: queue.Queue, ckpt: IngestCheckpoint, log_every: int, checkpoint: bool):
+        stats = self.stats["upsert"]
+        try:
+            while True:
+                batch = self._get(q_in)
+                if batch is _DONE:
+                    break
+                t0 = time.perf_counter()
+                # point ids are content hashes, so replaying a batch after a crash is idempotent;
+                # the store batches the upload itself and _commit waits for it at checkpoint time
+                self.store.upsert(batch.vectors, batch.payloads, wait=False)
+                if self.sparse_index is not None:
+                    self.sparse_index.add(batch.texts, batch.payloads)
+                stats.busy_s += time.perf_counter() - t0
+                stats.docs += len(batch.texts)
+
+                ckpt.offset = batch.end_offset
+                ckpt.n_docs = batch.start_doc + len(batch.texts)
+                ckpt.n_batches = batch.index + 1
+                if ckpt.n_batches % self.checkpoint_every == 0:
+                    self._commit(ckpt, checkpoint)
+                if log_every and ckpt.n_batches % log_every == 0:
+                    print(f"[ingest] {self.store.collection_name}: {ckpt.n_docs} docs")
+        except BaseException as e:
+            self._fail(e)
+
+    def _commit(self, ckpt: IngestCheckpoint, checkpoint: bool):
+        # persist (and wait for) what the checkpoint covers before the checkpoint itself; saving the
+        # sparse index also merges its buffered postings, so they never outgrow checkpoint_every batches
+        self.store.flush()
+        if self.sparse_index is not None:
+            self.sparse_index.save()
+        if checkpoint:
+            ckpt.save(self.checkpoint_path())
+
+    def _fail(self, e: BaseException):
+        if self._error is None:
+            self._error = e
+        self._stop.set()
+
+    def run(self, corpus_path: str, resume: bool = True, log_every: int = 10, checkpoint: bool = True) -> Dict[str, Any]:
+        """
+        Ingests corpus_path into the store. The collection must already exist.
+        With checkpoint=False no checkpoint is read or written.
+        Returns doc counts, overall and per-stage docs/sec.
+        """
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        ckpt = IngestCheckpoint.load(self.checkpoint_path()) if resume and checkpoint else None
+        reason = ckpt.resumable(corpus_path) if ckpt is not None else None
+        if reason is not None:
+            print(f"[ingest] not resuming {self.store.collection_name}: {reason}; starting from the beginning")
+        if ckpt is None or reason is not None:
+            ckpt = IngestCheckpoint(
+                corpus_path=os.path.abspath(corpus_path),
+                collection=self.store.collection_name,
+                fingerprint=corpus_fingerprint(corpus_path),
+            )
+        elif ckpt.n_docs:
+            print(f"[ingest] resuming {self.store.collection_name} at doc {ckpt.n_docs} (offset {ckpt.offset})")
+
+        self._stop.clear()
+        self._error = None
+        start_docs = ckpt.n_docs
+        q_batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        q_vectors: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._reader, args=(corpus_path, ckpt, q_batches), name="ingest-read", daemon=True),
+            threading.Thread(target=self._embed, args=(q_batches, q_vectors), name="ingest-embed", daemon=True),
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            self._upsert(q_vectors, ckpt, log_every, checkpoint)
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+            # a finished checkpoint is kept for its counts but never resumed from
+            ckpt.complete = self._error is None
+            # also on failure, so the store and lexical index cover everything the checkpoint does
+            self._commit(ckpt, checkpoint)
+        wall_s = time.perf_counter() - t0
+
+        if self._error is not None:
+            raise self._error
+
+        n = ckpt.n_docs - start_docs
+        return {
+            "collection": self.store.collection_name,
+            "docs": n,
+            "total_docs": ckpt.n_docs,
+            "wall_s": round(wall_s, 3),
+            "docs_per_s": round(n / wall_s, 1) if wall_s else 0.0,
+            "stages": {
+                s.name: {"docs": s.docs, "busy_s": round(s.busy_s, 3), "docs_per_s": round(s.docs_per_s, 1)}
+                for s in self.stats.values()
+            },
+        }
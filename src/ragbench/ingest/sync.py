@@ -0,0 +1,95 @@
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Set
+
+from ragbench.ingest.pipeline import IngestPipeline, default_payload
+from ragbench.store.base import payload_point_id
+
+def corpus_point_ids(
+    corpus_path: str,
+    make_payload: Callable[[Dict[str, Any]], Dict[str, Any]] = default_payload,
+) -> Set[str]:
+    ids = set()
+    with open(corpus_path, "r") as f:
+        for line in f:
+            if line.strip():
+                ids.add(payload_point_id(make_payload(json.loads(line))))
+    return ids
+
+def build_sparse_index(
+    corpus_path: str,
+    sparse_index,
+    make_payload: Callable[[Dict[str, Any]], Dict[str, Any]] = default_payload,
+    batch_size: int = 1024,
+):
+    """
+    (Re)builds a BM25Index from the corpus alone; no embeddings needed.
+    """
+    sparse_index.recreate()
+    texts, payloads = [], []
+    with open(corpus_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            texts.append(row["text"])
+            payloads.append(make_payload(row))
+            if len(texts) == batch_size:
+                sparse_index.add(texts, payloads)
+                texts, payloads = [], []
+    if texts:
+        sparse_index.add(texts, payloads)
+    sparse_index.save()
+
+def sync_corpus(
+    corpus_path: str,
+    embedder,
+    store,
+    batch_size: int = 256,
+    make_payload: Callable[[Dict[str, Any]], Dict[str, Any]] = default_payload,
+    dry_run: bool = False,
+    sparse_index=None,
+) -> Dict[str, Any]:
+    """
+    Incrementally brings a collection in line with a JSONL corpus.
+
+    Point ids hash (doc id, text), so a diff of id sets is a diff of content:
+    ids only in the corpus are embedded and upserted, ids only in the
+    collection are deleted, and everything else is left untouched.
+    A sparse_index (BM25Index) receives the same additions and deletions.
+    """
+    wanted = corpus_point_ids(corpus_path, make_payload)
+    existing = set(store.list_ids())
+
+    to_add = wanted - existing
+    to_delete = existing - wanted
+    report: Dict[str, Any] = {
+        "collection": store.collection_name,
+        "corpus_docs": len(wanted),
+        "existing_points": len(existing),
+        "unchanged": len(wanted & existing),
+        "added": len(to_add),
+        "deleted": len(to_delete),
+    }
+    if dry_run:
+        return report
+
+    if to_add:
+        ingest = IngestPipeline(
+            embedder,
+            store,
+            batch_size=batch_size,
+            make_payload=make_payload,
+            payload_filter=lambda p: payload_point_id(p) in to_add,
+            sparse_index=sparse_index,
+        )
+        report["ingest"] = ingest.run(corpus_path, resume=False, checkpoint=False)
+
+    if to_delete:
+        store.delete(sorted(to_delete))
+        store.flush()
+        if sparse_index is not None:
+            sparse_index.delete(sorted(to_delete))
+            sparse_index.save()
+
+    return report
@@ -1,13 +1,305 @@
-import time
+import threading
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 
-from ragbench.store.qdrant_store import QdrantStore
-from ragbench.embed.providers import OpenAIEmbeddingProvider
-from ragbench.embed.local_provider import LocalSTEmbeddingProvider
-from ragbench.rerank.providers import CrossEncoderReranker
+from ragbench.store.qdrant_store import QdrantOptions
+from ragbench.store.bm25 import BM25Index, DEFAULT_SPARSE_DIR, reciprocal_rank_fusion
+from ragbench.embed.cache import CachedEmbeddingProvider
+from ragbench.rerank.providers import CrossEncoderReranker, RerankedItem
+from ragbench.rerank.cache import RerankScoreCache
+from ragbench.rerank.cascade import CascadeReranker, LexicalOverlapScorer
+from ragbench.rerank.adaptive import RerankGate
+from ragbench.utils.tracing import TRACER
 
-def ms():
-    return int(time.perf_counter() * 1000)
+def span_ms(span) -> float:
+    return span.duration_ns / 1e6
+
+def to_candidates(dense) -> List[tuple]:
+    return [(r.payload.get("text", ""), dict(r.payload), getattr(r, "score", None)) for r in dense]
+
+@dataclass(frozen=True)
+class RagConfig:
+    collection: str
+    embed_model: str = "text-embedding-3-small"
+    dense_top_k: int = 10
+    use_rerank: bool = True
+    rerank_model: str = "BAAI/bge-reranker-base"
+    rerank_top_n: int = 3
+    embed_kind: str = "openai"
+    embed_cache_dir: str | None = None
+    store_kind: str = "qdrant"
+    qdrant: QdrantOptions = field(default_factory=QdrantOptions)
+    rerank_backend: str = "torch"  # "torch" | "onnx" | "onnx-int8"
+    rerank_batch_size: int = 32
+    rerank_max_length: int | None = None
+    rerank_num_threads: int | None = None  # None = leave as is; for "torch" this sets the process-wide torch pool
+    rerank_cache: bool = False
+    rerank_cache_path: str | None = None  # on-disk tier; None = in-memory LRU only
+    cascade_first_stage: str | None = None  # "lexical" or a small cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    cascade_top_m: int = 20
+    cascade_audit: bool = False
+    rerank_gate: RerankGate | None = None  # adaptive: skip the reranker when dense retrieval is decisive
+    # "hybrid" fuses dense and BM25 results with RRF; dense_top_k is then the fused candidate count
+    retrieval_mode: str = "dense"
+    hybrid_pool_k: int = 50  # depth of each ranking fed into the fusion
+    rrf_k: int = 60
+    sparse_dir: str = DEFAULT_SPARSE_DIR
+
+# backends are imported by the builders, so a run only loads the SDKs (openai, torch, qdrant_client) it uses
+def build_embedder(embed_kind: str, embed_model: str, cache_dir: str | None = None):
+    if embed_kind == "openai":
+        from ragbench.embed.providers import OpenAIEmbeddingProvider
+        embedder = OpenAIEmbeddingProvider(model=embed_model)
+    elif embed_kind == "local":
+        from ragbench.embed.local_provider import LocalSTEmbeddingProvider
+        embedder = LocalSTEmbeddingProvider(embed_model)
+    else:
+        raise ValueError("embed_kind must be 'openai' or 'local'")
+
+    if cache_dir:
+        embedder = CachedEmbeddingProvider(embedder, cache_dir=cache_dir)
+    return embedder
+
+def build_store(store_kind: str, collection: str, vector_size: int, qdrant_options: QdrantOptions | None = None):
+    if store_kind == "qdrant":
+        from ragbench.store.qdrant_store import QdrantStore
+        return QdrantStore(collection_name=collection, vector_size=vector_size, options=qdrant_options)
+    if store_kind == "numpy":
+        from ragbench.store.numpy_store import NumpyStore
+        return NumpyStore(collection_name=collection, vector_size=vector_size)
+    raise ValueError("store_kind must be 'qdrant' or 'numpy'")
+
+def build_reranker(config: RagConfig):
+    if not config.use_rerank:
+        return None
+    cache = RerankScoreCache(path=config.rerank_cache_path) if config.rerank_cache else None
+    kwargs = dict(
+        batch_size=config.rerank_batch_size,
+        max_length=config.rerank_max_length,
+        num_threads=config.rerank_num_threads,
+        cache=cache,
+    )
+    if config.rerank_backend == "torch":
+        reranker = CrossEncoderReranker(model=config.rerank_model, **kwargs)
+    elif config.rerank_backend in ("onnx", "onnx-int8"):
+        from ragbench.rerank.onnx_provider import OnnxCrossEncoderReranker
+        reranker = OnnxCrossEncoderReranker(
+            model=config.rerank_model, quantize=config.rerank_backend == "onnx-int8", **kwargs
+        )
+    else:
+        raise ValueError("rerank_backend must be 'torch', 'onnx' or 'onnx-int8'")
+
+    if not config.cascade_first_stage:
+        return reranker
+    if config.cascade_first_stage == "lexical":
+        first = LexicalOverlapScorer()
+    else:
+        first = CrossEncoderReranker(model=config.cascade_first_stage, **kwargs)
+    return CascadeReranker(
+        [(config.cascade_first_stage, first, config.cascade_top_m)], reranker, audit=config.cascade_audit
+    )
+
+class RagPipeline:
+    """
+    Retrieval pipeline built once from a RagConfig and queried many times.
+    Keeps the embedder, Qdrant client and reranker model loaded between questions.
+    Already loaded components can be passed in to share them between pipelines.
+    """
+    def __init__(self, config: RagConfig, embedder=None, store=None, reranker=None):
+        if config.retrieval_mode not in ("dense", "hybrid"):
+            raise ValueError("retrieval_mode must be 'dense' or 'hybrid'")
+        self.config = config
+        if embedder is None:
+            embedder = build_embedder(config.embed_kind, config.embed_model, config.embed_cache_dir)
+        if store is None:
+            store = build_store(config.store_kind, config.collection, embedder.dim, config.qdrant)
+        if reranker is None:
+            reranker = build_reranker(config)
+        self.embedder = embedder
+        self.store = store
+        self.reranker = reranker if config.use_rerank else None
+        self.sparse = None
+        if config.retrieval_mode == "hybrid":
+            self.sparse = BM25Index(config.collection, data_dir=config.sparse_dir)
+            if not self.sparse.exists():
+                raise FileNotFoundError(
+                    f"No BM25 index for '{config.collection}' under {config.sparse_dir}; reindex with a sparse index"
+                )
+        # running per-query rerank cost, reported as latency saved when the gate skips;
+        # locked because run() is called from many threads on one pipeline under load
+        self._rerank_ms_total = 0.0
+        self._rerank_queries = 0
+        self._rerank_lock = threading.Lock()
+
+    def run(self, question: str) -> Dict[str, Any]:
+        cfg = self.config
+
+        with TRACER.span("rag.run", collection=cfg.collection):
+            with TRACER.span("embed_query", model=cfg.embed_model) as s_embed:
+                qvec = self.embedder.embed_query(question)
+
+            with TRACER.span("retrieve", mode=cfg.retrieval_mode, top_k=cfg.dense_top_k) as s_retrieve:
+                if self.sparse is None:
+                    dense = self.store.search(qvec, top_k=cfg.dense_top_k)
+                    hits, top_dense = dense, None
+                else:
+                    dense = self.store.search(qvec, top_k=max(cfg.hybrid_pool_k, cfg.dense_top_k))
+                    hits, top_dense = self._fuse(question, dense)
+
+            candidates = to_candidates(hits)
+
+            t_rerank = 0.0
+            reranked, trace, decision = [], None, None
+            if self.reranker is not None:
+                [reranked], [trace], [t_rerank], [decision] = self._rerank([question], [candidates])
+
+        return self._record(
+            question, candidates, reranked, span_ms(s_embed), span_ms(s_retrieve), t_rerank, trace, decision, top_dense
+        )
+
+    def run_batch(self, questions: List[str], query_vectors=None, query_embed_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Same records as run(), but with one embedding call, one Qdrant batch search
+        and one cross-encoder pass for all questions. Per-item timings are the
+        batch stage time divided evenly across items.
+        query_vectors: embeddings already computed for these questions (e.g. shared by
+        several configs with the same embedder). No embed_query span is recorded (the
+        caller traced the embedding); query_embed_ms is the per-item time it took, so
+        embed_query and total_retrieval keep their meaning.
+        """
+        cfg = self.config
+        n = len(questions)
+        if n == 0:
+            return []
+
+        with TRACER.span("rag.run_batch", collection=cfg.collection, batch_size=n):
+            if query_vectors is None:
+                with TRACER.span("embed_query", model=cfg.embed_model, batch_size=n) as s_embed:
+                    qvecs = self.embedder.embed_queries(questions)
+                t_embed_q = span_ms(s_embed) / n
+            else:
+                qvecs, t_embed_q = query_vectors, query_embed_ms
+
+            with TRACER.span("retrieve", mode=cfg.retrieval_mode, top_k=cfg.dense_top_k, batch_size=n) as s_retrieve:
+                if self.sparse is None:
+                    hits_batch = self.store.search_batch(qvecs, top_k=cfg.dense_top_k)
+                    top_dense = [None] * n
+                else:
+                    dense_batch = self.store.search_batch(qvecs, top_k=max(cfg.hybrid_pool_k, cfg.dense_top_k))
+                    hits_batch, top_dense = zip(*[self._fuse(q, dense) for q, dense in zip(questions, dense_batch)])
+
+            candidates_list = [to_candidates(hits) for hits in hits_batch]
+
+            reranked_list = [[] for _ in questions]
+            traces = [None] * n
+            t_rerank = [0.0] * n
+            decisions = [None] * n
+            if self.reranker is not None:
+                reranked_list, traces, t_rerank, decisions = self._rerank(questions, candidates_list)
+
+        t_retrieve = span_ms(s_retrieve) / n
+        return [
+            self._record(q, cands, reranked, t_embed_q, t_retrieve, t_rr, trace, decision, td)
+            for q, cands, reranked, trace, t_rr, decision, td
+            in zip(questions, candidates_list, reranked_list, traces, t_rerank, decisions, top_dense)
+        ]
+
+    def _fuse(self, question: str, dense):
+        """
+        RRF of the dense hits and the BM25 top hybrid_pool_k, cut to dense_top_k.
+        Candidate scores become RRF scores; the best cosine score is returned separately
+        so top_dense_score keeps its meaning for the tau_dense guardrail.
+        """
+        cfg = self.config
+        sparse = self.sparse.search(question, top_k=cfg.hybrid_pool_k)
+        fused = reciprocal_rank_fusion([list(dense), sparse], k=cfg.rrf_k, top_k=cfg.dense_top_k)
+        return fused, (dense[0].score if dense else 0)
+
+    def _rerank(self, questions, candidates_list):
+        """
+        Reranks every question the gate (if any) does not skip, in one batch.
+        Returns per-question reranked items, cascade traces, rerank ms and gate decisions.
+        Skipped questions keep the dense top-n with rerank_score=None.
+        """
+        cfg = self.config
+        n = len(questions)
+        reranked = [
+            [RerankedItem(text=c[0], payload=c[1], base_score=c[2], rerank_score=None) for c in cands[:cfg.rerank_top_n]]
+            for cands in candidates_list
+        ]
+        traces = [None] * n
+        timings = [0.0] * n
+        decisions = [None] * n
+
+        keep = list(range(n))
+        if cfg.rerank_gate is not None:
+            decisions = [cfg.rerank_gate.decide([c[2] for c in cands]) for cands in candidates_list]
+            keep = [i for i, d in enumerate(decisions) if not d["skipped"]]
+
+        if keep:
+            sub_q = [questions[i] for i in keep]
+            sub_c = [candidates_list[i] for i in keep]
+            with TRACER.span("rerank", model=self.reranker.model_name, batch_size=len(keep)) as s_rerank:
+                if isinstance(self.reranker, CascadeReranker):
+                    out, sub_traces = self.reranker.rerank_batch_traced(sub_q, sub_c, top_n=cfg.rerank_top_n)
+                else:
+                    out, sub_traces = self.reranker.rerank_batch(sub_q, sub_c, top_n=cfg.rerank_top_n), [None] * len(keep)
+            elapsed = span_ms(s_rerank)
+            with self._rerank_lock:
+                self._rerank_ms_total += elapsed
+                self._rerank_queries += len(keep)
+            for j, i in enumerate(keep):
+                reranked[i], traces[i], timings[i] = out[j], sub_traces[j], elapsed / len(keep)
+
+        if cfg.rerank_gate is not None:
+            with self._rerank_lock:
+                per_query = self._rerank_ms_total / self._rerank_queries if self._rerank_queries else 0.0
+            # no logging here (run() is called per query under load); gate_summary(records) aggregates
+            for d in decisions:
+                if d["skipped"]:
+                    d["ms_saved"] = per_query
+        return reranked, traces, timings, decisions
+
+    def _record(
+        self, question, candidates, reranked, t_embed_q, t_retrieve, t_rerank,
+        cascade=None, rerank_decision=None, top_dense_score=None,
+    ) -> Dict[str, Any]:
+        cfg = self.config
+        context_chunks = [it.text for it in reranked] if self.reranker is not None else [c[0] for c in candidates]
+
+        return {
+            "question": question,
+            "embed_model": cfg.embed_model,
+            "dense_top_k": cfg.dense_top_k,
+            "use_rerank": cfg.use_rerank,
+            "rerank_model": cfg.rerank_model if cfg.use_rerank else None,
+            "rerank_top_n": cfg.rerank_top_n if cfg.use_rerank else 0,
+            "rerank_backend": cfg.rerank_backend if cfg.use_rerank else None,
+            "retrieval_mode": cfg.retrieval_mode,
+            "store": self.store.settings(),
+            "timings_ms": {
+                "embed_query": t_embed_q,
+                "retrieve": t_retrieve,
+                "rerank": t_rerank,
+                "total_retrieval": t_embed_q + t_retrieve + t_rerank,
+            },
+            "cascade": cascade,
+            "rerank_decision": rerank_decision,
+            "dense_results": [{"text": c[0], "payload": c[1], "score": c[2]} for c in candidates],
+            "context_chunks": context_chunks,
+            "top_dense_score": top_dense_score if top_dense_score is not None else (candidates[0][2] if candidates else 0),
+            "top_rerank_score": reranked[0].rerank_score if reranked else None
+        }
+
+# one warm pipeline per distinct config, so repeated run_rag calls reuse loaded models
+_PIPELINES: Dict[RagConfig, RagPipeline] = {}
+
+def get_pipeline(config: RagConfig) -> RagPipeline:
+    pipe = _PIPELINES.get(config)
+    if pipe is None:
+        pipe = RagPipeline(config)
+        _PIPELINES[config] = pipe
+    return pipe
 
 def run_rag(
     question: str,
@@ -19,52 +311,34 @@ def run_rag(
     rerank_top_n: int = 3,
     embed_kind: str = "openai"
 ) -> Dict[str, Any]:
-    
-    if embed_kind == "openai":
-        embedder = OpenAIEmbeddingProvider(model=embed_model)
-    elif embed_kind == "local":
-        embedder = LocalSTEmbeddingProvider(embed_model)
-    else:
-        raise ValueError("embed_kind must be 'openai' or 'local'")
+    config = RagConfig(
+        collection=collection,
+        embed_model=embed_model,
+        dense_top_k=dense_top_k,
+        use_rerank=use_rerank,
+        rerank_model=rerank_model,
+        rerank_top_n=rerank_top_n,
+        embed_kind=embed_kind,
+    )
+    return get_pipeline(config).run(question)
 
-    # embedder = OpenAIEmbeddingProvider(model=embed_model)
-    store = QdrantStore(collection_name=collection, vector_size=embedder.dim)
-
-    t1 = ms()
-    qvec = embedder.embed_query(question)
-    t_embed_q = ms() - t1
-
-    t2 = ms()
-    dense = store.search(qvec, top_k=dense_top_k)
-    t_retrieve = ms() - t2
-
-    candidates = [(r.payload.get("text", ""), dict(r.payload), getattr(r, "score", None)) for r in dense]
-    context_chunks = [c[0] for c in candidates]
-
-    t_rerank = 0
-    reranked = []
-    if use_rerank:
-        rr = CrossEncoderReranker(model=rerank_model)
-        t3 = ms()
-        reranked = rr.rerank(question, candidates, top_n=rerank_top_n)
-        t_rerank = ms() - t3
-        context_chunks = [it.text for it in reranked]
-
-    return {
-        "question": question,
-        "embed_model": embed_model,
-        "dense_top_k": dense_top_k,
-        "use_rerank": use_rerank,
-        "rerank_model": rerank_model if use_rerank else None,
-        "rerank_top_n": rerank_top_n if use_rerank else 0,
-        "timings_ms": {
-            "embed_query": t_embed_q,
-            "retrieve": t_retrieve,
-            "rerank": t_rerank,
-            "total_retrieval": t_embed_q + t_retrieve + t_rerank,
-        },
-        "dense_results": [{"text": c[0], "payload": c[1], "score": c[2]} for c in candidates],
-        "context_chunks": context_chunks,
-        "top_dense_score": candidates[0][2] if candidates else 0,
-        "top_rerank_score": reranked[0].rerank_score if reranked else None
-    }
+def run_rag_batch(
+    questions: List[str],
+    collection: str,
+    embed_model: str = "text-embedding-3-small",
+    dense_top_k: int = 10,
+    use_rerank: bool = True,
+    rerank_model: str = "BAAI/bge-reranker-base",
+    rerank_top_n: int = 3,
+    embed_kind: str = "openai"
+) -> List[Dict[str, Any]]:
+    config = RagConfig(
+        collection=collection,
+        embed_model=embed_model,
+        dense_top_k=dense_top_k,
+        use_rerank=use_rerank,
+        rerank_model=rerank_model,
+        rerank_top_n=rerank_top_n,
+        embed_kind=embed_kind,
+    )
+    return get_pipeline(config).run_batch(questions)
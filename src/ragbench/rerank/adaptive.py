@@ -0,0 +1,85 @@
+from __future__ import annotations
+import copy
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+def dense_margin(scores: Sequence[float]) -> float:
+    """
+    Gap between the best and second-best dense score (inf with fewer than two results).
+    """
+    s = sorted((x for x in scores if x is not None), reverse=True)
+    if len(s) < 2:
+        return math.inf
+    return float(s[0] - s[1])
+
+def dense_entropy(scores: Sequence[float], temperature: float = 0.05) -> float:
+    """
+    Entropy of softmax(scores / temperature), normalised to [0, 1].
+    Near 0 when one result dominates, 1 when all are tied.
+    """
+    s = np.asarray([x for x in scores if x is not None], dtype=np.float64)
+    if len(s) < 2:
+        return 0.0
+    z = (s - s.max()) / temperature
+    p = np.exp(z)
+    p /= p.sum()
+    h = -(p * np.log(np.clip(p, 1e-12, None))).sum()
+    return float(h / math.log(len(s)))
+
+
+@dataclass(frozen=True)
+class RerankGate:
+    """
+    Per-query decision to skip the cross-encoder when dense retrieval is already decisive.
+    mode="margin": skip when top1 - top2 >= threshold.
+    mode="entropy": skip when the normalised softmax entropy over the top-k <= threshold.
+    """
+    mode: str = "margin"
+    threshold: float = 0.05
+    temperature: float = 0.05
+
+    def decide(self, dense_scores: Sequence[float]) -> Dict[str, Any]:
+        if self.mode == "margin":
+            signal = dense_margin(dense_scores)
+            skipped = signal >= self.threshold
+        elif self.mode == "entropy":
+            signal = dense_entropy(dense_scores, self.temperature)
+            skipped = signal <= self.threshold
+        else:
+            raise ValueError("RerankGate.mode must be 'margin' or 'entropy'")
+        return {"mode": self.mode, "signal": signal, "skipped": bool(skipped), "ms_saved": 0.0}
+
+
+def simulate_gate(records: List[Dict[str, Any]], gate: RerankGate) -> List[Dict[str, Any]]:
+    """
+    Replays a gate offline over always-rerank records: skipped queries fall back to the
+    dense top-n and get their measured rerank time back as ms_saved. Lets scripts compare
+    adaptive and always-rerank without running retrieval twice.
+    """
+    out = []
+    for rec in records:
+        rec = copy.copy(rec)
+        decision = gate.decide([d["score"] for d in rec["dense_results"]])
+        if decision["skipped"]:
+            timings = dict(rec["timings_ms"])
+            decision["ms_saved"] = timings["rerank"]
+            timings["total_retrieval"] -= timings["rerank"]
+            timings["rerank"] = 0
+            rec["timings_ms"] = timings
+            rec["context_chunks"] = [d["text"] for d in rec["dense_results"][:rec["rerank_top_n"]]]
+            rec["top_rerank_score"] = None
+        rec["rerank_decision"] = decision
+        out.append(rec)
+    return out
+
+def gate_summary(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    decisions = [r["rerank_decision"] for r in records if r.get("rerank_decision")]
+    if not decisions:
+        return {"skip_rate": 0.0, "avg_rerank_ms_saved": 0.0}
+    return {
+        "skip_rate": sum(d["skipped"] for d in decisions) / len(decisions),
+        "avg_rerank_ms_saved": sum(d["ms_saved"] for d in decisions) / len(decisions),
+    }
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RERANK_CACHE_PATH = ".cache/rerank_scores.sqlite"
+
+ScoreKey = Tuple[str, str, str]  # (reranker namespace, query hash, chunk hash)
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RerankScoreCache:
+    """
+    Two-tier cache of cross-encoder scores keyed by (reranker, query hash, chunk hash).
+    An in-memory LRU of max_memory_entries sits in front of an optional SQLite file
+    (path=None keeps everything in memory). The disk tier is capped at max_disk_entries (LRU).
+    Scores are stored as the model's float32 output, so cached and fresh scores are identical.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 100_000,
+        max_disk_entries: int = 1_000_000,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[ScoreKey, float]" = OrderedDict()
+        self._db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "model TEXT NOT NULL, query_hash TEXT NOT NULL, chunk_hash TEXT NOT NULL, "
+                "score REAL NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (model, query_hash, chunk_hash))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_scores_last_used ON scores(last_used)")
+            self._db.commit()
+
+    def _remember(self, key: ScoreKey, score: float):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[ScoreKey]) -> Dict[ScoreKey, float]:
+        found: Dict[ScoreKey, float] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            on_disk = []
+            for key in unique:
+                score = self._memory.get(key)
+                if score is None:
+                    on_disk.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = score
+            self.memory_hits += len(found)
+
+            if self._db is not None and on_disk:
+                now = time.time()
+                hits = []
+                for key in on_disk:
+                    row = self._db.execute(
+                        "SELECT score FROM scores WHERE model = ? AND query_hash = ? AND chunk_hash = ?", key
+                    ).fetchone()
+                    if row is not None:
+                        found[key] = row[0]
+                        self._remember(key, row[0])
+                        hits.append(key)
+                if hits:
+                    self._db.executemany(
+                        "UPDATE scores SET last_used = ? WHERE model = ? AND query_hash = ? AND chunk_hash = ?",
+                        [(now, *key) for key in hits],
+                    )
+                    self._db.commit()
+                self.disk_hits += len(hits)
+
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, keys: List[ScoreKey], scores: List[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._remember(key, float(score))
+
+            if self._db is None or not keys:
+                return
+            now = time.time()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scores (model, query_hash, chunk_hash, score, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(*key, float(score), now) for key, score in zip(keys, scores)],
+            )
+            n = self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            if n > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY last_used ASC LIMIT ?)",
+                    (n - self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ragbench.rerank.providers import RerankedItem
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str) -> set:
+    return set(_TOKEN.findall(text.lower()))
+
+
+class LexicalOverlapScorer:
+    """
+    Cheapest possible first stage: fraction of query tokens that occur in the chunk.
+    """
+    model_name = "lexical-overlap"
+
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        q_tokens: Dict[str, set] = {}
+        out = np.empty(len(pairs), dtype=np.float32)
+        for i, (q, d) in enumerate(pairs):
+            qt = q_tokens.get(q)
+            if qt is None:
+                qt = q_tokens[q] = tokenize(q)
+            out[i] = len(qt & tokenize(d)) / len(qt) if qt else 0.0
+        return out
+
+
+class CascadeReranker:
+    """
+    Multi-stage reranking: each (name, scorer, keep_m) stage scores the surviving candidates
+    with scorer.score_pairs and keeps the best keep_m; the final reranker only sees what is left.
+
+    With audit=True the final reranker also scores the full candidate list, and each stage
+    reports the share of the uncascaded top-n it kept (stage recall). That costs the full
+    rerank again, so it is meant for tuning keep_m, not for serving.
+    """
+    def __init__(self, stages: List[Tuple[str, Any, int]], final, audit: bool = False):
+        self.stages = stages
+        self.final = final
+        self.audit = audit
+        self.model_name = "cascade:" + ">".join(
+            [f"{name}@{keep_m}" for name, _, keep_m in stages] + [final.model_name]
+        )
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Tuple[str, dict, float | None]],
+        top_n: int = 3,
+    ) -> List[RerankedItem]:
+        return self.rerank_batch([query], [candidates], top_n=top_n)[0]
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        candidates_list: List[List[Tuple[str, dict, float | None]]],
+        top_n: int = 3,
+    ) -> List[List[RerankedItem]]:
+        return self.rerank_batch_traced(queries, candidates_list, top_n=top_n)[0]
+
+    def rerank_batch_traced(
+        self,
+        queries: List[str],
+        candidates_list: List[List[Tuple[str, dict, float | None]]],
+        top_n: int = 3,
+        reference: List[List[RerankedItem]] | None = None,
+    ) -> Tuple[List[List[RerankedItem]], List[Dict[str, Any]]]:
+        """
+        Returns the reranked lists plus one trace per query:
+        {"stages": [{"name", "n_in", "n_out", "ms", "recall"}...]}.
+        Stage latency is the batch stage time divided evenly across queries.
+        "recall" is filled in against reference (the final reranker's top-n over all
+        candidates) when it is passed, or computed here with audit=True.
+        """
+        assert len(queries) == len(candidates_list), "queries and candidates_list must align"
+        n = len(queries)
+        if n == 0:
+            return [], []
+
+        # survivors are kept as indices into the original candidate lists
+        survivors = [list(range(len(cands))) for cands in candidates_list]
+        traces: List[Dict[str, Any]] = [{"stages": []} for _ in queries]
+        kept_texts: List[List[set]] = [[] for _ in queries]  # per query, per stage (for audit)
+
+        for name, scorer, keep_m in self.stages:
+            pairs = [(q, candidates_list[qi][ci][0]) for qi, q in enumerate(queries) for ci in survivors[qi]]
+            t0 = time.perf_counter()
+            scores = scorer.score_pairs(pairs)
+            stage_ms = (time.perf_counter() - t0) * 1000 / n
+
+            offset = 0
+            for qi in range(n):
+                idx = survivors[qi]
+                s = scores[offset:offset + len(idx)]
+                offset += len(idx)
+                order = np.argsort(-s, kind="stable")[:keep_m]
+                survivors[qi] = [idx[j] for j in sorted(order.tolist())]  # keep dense order
+                kept_texts[qi].append({candidates_list[qi][ci][0] for ci in survivors[qi]})
+                traces[qi]["stages"].append(
+                    {"name": name, "n_in": len(idx), "n_out": len(survivors[qi]), "ms": stage_ms, "recall": None}
+                )
+
+        pruned = [[candidates_list[qi][ci] for ci in survivors[qi]] for qi in range(n)]
+        t0 = time.perf_counter()
+        out = self.final.rerank_batch(queries, pruned, top_n=top_n)
+        final_ms = (time.perf_counter() - t0) * 1000 / n
+        for qi in range(n):
+            traces[qi]["stages"].append(
+                {"name": self.final.model_name, "n_in": len(pruned[qi]), "n_out": len(out[qi]), "ms": final_ms, "recall": None}
+            )
+            kept_texts[qi].append({it.text for it in out[qi]})
+
+        if reference is None and self.audit:
+            reference = self.final.rerank_batch(queries, candidates_list, top_n=top_n)
+        if reference is not None:
+            for qi in range(n):
+                ref_texts = {it.text for it in reference[qi]}
+                if not ref_texts:
+                    continue
+                for stage, kept in zip(traces[qi]["stages"], kept_texts[qi]):
+                    stage["recall"] = len(ref_texts & kept) / len(ref_texts)
+        return out, traces
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from ragbench.rerank.cache import RerankScoreCache
+from ragbench.rerank.providers import CrossEncoderReranker
+
+DEFAULT_ONNX_DIR = ".cache/onnx"
+# position-embedding limit of BERT/XLM-R style cross-encoders; tokenizers without a
+# configured model_max_length report a huge sentinel instead
+MAX_POSITIONS = 512
+
+def export_onnx(model_name: str, out_dir: str = DEFAULT_ONNX_DIR, quantize: bool = False) -> str:
+    """
+    Exports a HF sequence-classification cross-encoder to ONNX once (optionally
+    int8 dynamic-quantized) and returns the .onnx path. Later calls reuse the file.
+    """
+    model_dir = os.path.join(out_dir, model_name.replace("/", "__"))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        os.makedirs(model_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        dummy = tokenizer(["query"], ["document text"], return_tensors="pt")
+        input_names = list(dummy.keys())
+        dynamic_axes = {name: {0: "batch", 1: "seq"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+        tokenizer.save_pretrained(model_dir)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    return target
+
+
+class OnnxCrossEncoderReranker(CrossEncoderReranker):
+    """
+    Same scoring as CrossEncoderReranker, run through ONNX Runtime on CPU.
+    quantize=True uses an int8 dynamic-quantized export. Scores go through a sigmoid
+    like CrossEncoder does for single-label models, so thresholds stay comparable.
+    """
+    def __init__(
+        self,
+        model: str = "BAAI/bge-reranker-base",
+        batch_size: int = 32,
+        max_length: int | None = 512,
+        num_threads: int | None = None,
+        sort_by_length: bool = True,
+        quantize: bool = False,
+        onnx_dir: str = DEFAULT_ONNX_DIR,
+        cache: RerankScoreCache | None = None,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.sort_by_length = sort_by_length
+        self.quantize = quantize
+        self.backend = "onnx-int8" if quantize else "onnx"
+        self.cache = cache
+
+        self.onnx_path = export_onnx(model, onnx_dir, quantize=quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(self.onnx_path))
+        # like CrossEncoder, None means the model's own limit; the ONNX graph never sees longer inputs
+        self.max_length = max_length or min(self.tokenizer.model_max_length, MAX_POSITIONS)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(self.onnx_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        out = np.empty(len(pairs), dtype=np.float32)
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            enc = self.tokenizer(
+                [q for q, _ in batch],
+                [d for _, d in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {name: enc[name].astype(np.int64) for name in self.input_names}
+            logits = self.session.run(None, feeds)[0].reshape(len(batch), -1)[:, 0]
+            out[start:start + len(batch)] = 1.0 / (1.0 + np.exp(-logits))
+        return out
@@ -2,21 +2,97 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Tuple
 
+import numpy as np
+
+from ragbench.rerank.cache import RerankScoreCache, text_hash
+
 @dataclass
 class RerankedItem:
     text: str
     payload: dict
     base_score: float | None
-    rerank_score: float
+    rerank_score: float | None  # None when the reranker was skipped
+
+def length_sorted_order(pairs: List[Tuple[str, str]]) -> np.ndarray:
+    """
+    Pair order by combined character length, so each batch pads to similar lengths.
+    """
+    return np.argsort([len(q) + len(d) for q, d in pairs], kind="stable")
 
 class CrossEncoderReranker:
     """
     Cross-encoder reranker: scores (query, chunk) pairs.
+    Pairs are scored in length-sorted batches of batch_size, truncated to max_length tokens.
+    With a RerankScoreCache only pairs not seen before reach the model.
+    num_threads is left alone unless given. torch has one intra-op pool per process, so setting it
+    also resizes the pool of every other torch user (e.g. a local embedder); where that matters,
+    size it once per process instead, as bench/sharded._init_worker does for its workers.
     """
-    def __init__(self, model: str = "BAAI/bge-reranker-base"):
+    backend = "torch"
+
+    def __init__(
+        self,
+        model: str = "BAAI/bge-reranker-base",
+        batch_size: int = 32,
+        max_length: int | None = None,
+        num_threads: int | None = None,
+        sort_by_length: bool = True,
+        cache: RerankScoreCache | None = None,
+    ):
         from sentence_transformers import CrossEncoder
+        if num_threads:
+            import torch
+            # process-wide, see the class docstring
+            torch.set_num_threads(num_threads)
         self.model_name = model
-        self.model = CrossEncoder(model)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.num_threads = num_threads
+        self.sort_by_length = sort_by_length
+        self.cache = cache
+        self.model = CrossEncoder(model, max_length=max_length)
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        return np.asarray(
+            self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+            dtype=np.float32,
+        )
+
+    @property
+    def cache_namespace(self) -> str:
+        # truncation changes scores, so it is part of the key
+        return f"{self.backend}:{self.model_name}:{self.max_length}"
+
+    def _score_uncached(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        if not self.sort_by_length:
+            return self._predict(pairs)
+
+        order = length_sorted_order(pairs)
+        sorted_scores = self._predict([pairs[i] for i in order])
+        scores = np.empty_like(sorted_scores)
+        scores[order] = sorted_scores
+        return scores
+
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        if self.cache is None or not pairs:
+            return self._score_uncached(pairs)
+
+        ns = self.cache_namespace
+        keys = [(ns, text_hash(q), text_hash(d)) for q, d in pairs]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, pair in zip(keys, pairs):
+            if key not in found and key not in missing:
+                missing[key] = pair
+        if missing:
+            fresh = self._score_uncached(list(missing.values()))
+            self.cache.put_many(list(missing.keys()), fresh.tolist())
+            found.update(zip(missing.keys(), fresh.tolist()))
+
+        return np.array([found[key] for key in keys], dtype=np.float32)
 
     def rerank(
         self,
@@ -27,17 +103,35 @@ class CrossEncoderReranker:
         """
         candidates: list of (text, payload, base_score)
         """
-        pairs = [(query, c[0]) for c in candidates]
-        scores = self.model.predict(pairs).tolist()
-
-        items = [
-            RerankedItem(
-                text=candidates[i][0],
-                payload=candidates[i][1],
-                base_score=candidates[i][2],
-                rerank_score=float(scores[i]),
-            )
-            for i in range(len(candidates))
-        ]
-        items.sort(key=lambda x: x.rerank_score, reverse=True)
-        return items[:top_n]
\ No newline at end of file
+        return self.rerank_batch([query], [candidates], top_n=top_n)[0]
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        candidates_list: List[List[Tuple[str, dict, float | None]]],
+        top_n: int = 3,
+    ) -> List[List[RerankedItem]]:
+        """
+        Scores every (query, candidate) pair of all queries in one pass.
+        """
+        assert len(queries) == len(candidates_list), "queries and candidates_list must align"
+
+        pairs = [(q, c[0]) for q, cands in zip(queries, candidates_list) for c in cands]
+        scores = self.score_pairs(pairs).tolist()
+
+        out = []
+        offset = 0
+        for cands in candidates_list:
+            items = [
+                RerankedItem(
+                    text=c[0],
+                    payload=c[1],
+                    base_score=c[2],
+                    rerank_score=float(scores[offset + i]),
+                )
+                for i, c in enumerate(cands)
+            ]
+            offset += len(cands)
+            items.sort(key=lambda x: x.rerank_score, reverse=True)
+            out.append(items[:top_n])
+        return out
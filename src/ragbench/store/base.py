@@ -0,0 +1,48 @@
+from __future__ import annotations
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Protocol
+
+import numpy as np
+
+# fixed namespace so the same (doc id, text) always maps to the same point id
+POINT_ID_NAMESPACE = uuid.UUID("5d0c7f3e-3b7a-4c1e-9a52-2f1d8e6b4a90")
+
+def point_id(doc_id: Any, text: str) -> str:
+    """
+    Deterministic UUID for a document version: changes iff its id or content changes.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{doc_id}\x1f{text}"))
+
+def payload_point_id(payload: Dict[str, Any]) -> str:
+    return point_id(payload.get("doc_id"), payload.get("text", ""))
+
+@dataclass
+class SearchHit:
+    """
+    Minimal stand-in for qdrant's ScoredPoint: what the pipeline reads from a hit.
+    """
+    id: Any
+    score: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class VectorStore(Protocol):
+    collection_name: str
+    vector_size: int
+    def settings(self) -> Dict[str, Any]: ...
+    def create_collection(self, recreate: bool = False): ...
+    def recreate_collection(self): ...
+    def upsert(
+        self,
+        vectors: np.ndarray,
+        payloads: List[Dict[str, Any]],
+        batch_size: int | None = None,
+        ids: List[Any] | None = None,
+        wait: bool = True,
+    ): ...
+    def search(self, query_vector: np.ndarray, top_k: int = 3) -> list: ...
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 3) -> List[list]: ...
+    def list_ids(self) -> List[Any]: ...
+    def delete(self, ids: List[Any]): ...
+    def flush(self): ...
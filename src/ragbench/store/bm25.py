@@ -0,0 +1,218 @@
+from __future__ import annotations
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from ragbench.store.base import SearchHit, payload_point_id
+
+DEFAULT_SPARSE_DIR = "data/sparse"
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process lexical index scored with Okapi BM25.
+    Postings are CSR arrays: postings for term t are doc_ids/tfs[indptr[t]:indptr[t+1]].
+    Adds and deletes are buffered and merged into the CSR arrays on the next search or save.
+    Persists as .npy files (loaded with mmap) next to ids.json / payloads.jsonl, like NumpyStore.
+    """
+    def __init__(self, name: str, data_dir: str = DEFAULT_SPARSE_DIR, k1: float = 1.2, b: float = 0.75):
+        self.name = name
+        self.path = os.path.join(data_dir, name)
+        self.k1 = k1
+        self.b = b
+        self._reset()
+        if self.exists():
+            self._load()
+
+    def _reset(self):
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._row_of: Dict[Any, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        # buffered since the last merge: (term id, row, tf) triplets, new doc lengths, deleted rows
+        self._new_terms: List[int] = []
+        self._new_rows: List[int] = []
+        self._new_tfs: List[int] = []
+        self._new_lens: List[int] = []
+        self._dead: set = set()
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "indptr.npy"))
+
+    def settings(self) -> Dict[str, Any]:
+        return {"backend": "bm25", "data_dir": os.path.dirname(self.path), "k1": self.k1, "b": self.b}
+
+    def stats(self) -> Dict[str, int]:
+        self._merge()
+        return {"docs": len(self.ids), "terms": len(self.vocab), "postings": len(self.doc_ids)}
+
+    def _load(self):
+        self.indptr = np.load(os.path.join(self.path, "indptr.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(self.path, "doc_ids.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(self.path, "tfs.npy"), mmap_mode="r")
+        self.doc_len = np.load(os.path.join(self.path, "doc_len.npy"), mmap_mode="r")
+        with open(os.path.join(self.path, "vocab.json"), "r") as f:
+            self.vocab = {t: i for i, t in enumerate(json.load(f))}
+        with open(os.path.join(self.path, "ids.json"), "r") as f:
+            self.ids = json.load(f)
+        with open(os.path.join(self.path, "payloads.jsonl"), "r") as f:
+            self.payloads = [json.loads(line) for line in f if line.strip()]
+        self._row_of = {pid: i for i, pid in enumerate(self.ids)}
+
+    def save(self):
+        self._merge()
+        os.makedirs(self.path, exist_ok=True)
+        for name in ("indptr", "doc_ids", "tfs", "doc_len"):
+            tmp = os.path.join(self.path, f"{name}.tmp.npy")
+            np.save(tmp, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp, os.path.join(self.path, f"{name}.npy"))
+        terms = [None] * len(self.vocab)
+        for t, i in self.vocab.items():
+            terms[i] = t
+        with open(os.path.join(self.path, "vocab.json"), "w") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(self.path, "ids.json"), "w") as f:
+            json.dump(self.ids, f)
+        with open(os.path.join(self.path, "payloads.jsonl"), "w") as f:
+            for p in self.payloads:
+                f.write(json.dumps(p, ensure_ascii=False) + "\n")
+
+    def recreate(self):
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        self._reset()
+        self.save()
+
+    def add(self, texts: Sequence[str], payloads: List[Dict[str, Any]], ids: List[Any] | None = None):
+        """
+        Upsert semantics: an id that is already indexed is replaced.
+        """
+        assert len(texts) == len(payloads), "texts and payloads must align"
+        ids = list(ids) if ids is not None else [payload_point_id(p) for p in payloads]
+        for pid, text, payload in zip(ids, texts, payloads):
+            old = self._row_of.get(pid)
+            if old is not None:
+                self._dead.add(old)
+            row = len(self.ids)
+            self.ids.append(pid)
+            self.payloads.append(payload)
+            self._row_of[pid] = row
+
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                tid = self.vocab.get(term)
+                if tid is None:
+                    tid = self.vocab[term] = len(self.vocab)
+                self._new_terms.append(tid)
+                self._new_rows.append(row)
+                self._new_tfs.append(tf)
+            self._new_lens.append(len(tokens))
+
+    def delete(self, ids: List[Any]):
+        for pid in ids:
+            row = self._row_of.pop(pid, None)
+            if row is not None:
+                self._dead.add(row)
+
+    def _merge(self):
+        if not self._new_lens and not self._dead:
+            return
+
+        n_terms = len(self.vocab)
+        terms = np.concatenate([
+            np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr)),
+            np.asarray(self._new_terms, dtype=np.int64),
+        ])
+        rows = np.concatenate([np.asarray(self.doc_ids, dtype=np.int64), np.asarray(self._new_rows, dtype=np.int64)])
+        tfs = np.concatenate([np.asarray(self.tfs, dtype=np.float32), np.asarray(self._new_tfs, dtype=np.float32)])
+        doc_len = np.concatenate([np.asarray(self.doc_len, dtype=np.float32), np.asarray(self._new_lens, dtype=np.float32)])
+
+        if self._dead:
+            alive = np.ones(len(self.ids), dtype=bool)
+            alive[list(self._dead)] = False
+            new_row = np.cumsum(alive) - 1
+            keep = alive[rows]
+            terms, rows, tfs = terms[keep], new_row[rows[keep]], tfs[keep]
+            doc_len = doc_len[alive]
+            self.ids = [pid for pid, a in zip(self.ids, alive) if a]
+            self.payloads = [p for p, a in zip(self.payloads, alive) if a]
+            self._row_of = {pid: i for i, pid in enumerate(self.ids)}
+
+        order = np.argsort(terms, kind="stable")
+        self.doc_ids = rows[order].astype(np.int32)
+        self.tfs = tfs[order]
+        self.doc_len = doc_len
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=self.indptr[1:])
+
+        self._new_terms, self._new_rows, self._new_tfs, self._new_lens = [], [], [], []
+        self._dead = set()
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every document for query (unique query terms, IDF with +1 smoothing).
+        """
+        self._merge()
+        n = len(self.ids)
+        tids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if n == 0 or not tids:
+            return np.zeros(n, dtype=np.float32)
+
+        tids = np.asarray(tids, dtype=np.int64)
+        starts, ends = self.indptr[tids], self.indptr[tids + 1]
+        df = ends - starts
+        idx = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+        docs = self.doc_ids[idx]
+        tf = self.tfs[idx]
+        avgdl = float(self.doc_len.mean()) or 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / avgdl)
+        contrib = np.repeat(idf, df) * tf * (self.k1 + 1.0) / (tf + norm)
+        return np.bincount(docs, weights=contrib, minlength=n).astype(np.float32)
+
+    def search(self, query: str, top_k: int = 10) -> List[SearchHit]:
+        s = self.scores(query)
+        hit_rows = np.flatnonzero(s > 0)
+        if top_k <= 0 or len(hit_rows) == 0:
+            return []
+        if len(hit_rows) > top_k:
+            hit_rows = hit_rows[np.argpartition(-s[hit_rows], top_k - 1)[:top_k]]
+        hit_rows = hit_rows[np.argsort(-s[hit_rows], kind="stable")]
+        return [SearchHit(id=self.ids[i], score=float(s[i]), payload=self.payloads[i]) for i in hit_rows]
+
+    def search_batch(self, queries: List[str], top_k: int = 10) -> List[List[SearchHit]]:
+        return [self.search(q, top_k=top_k) for q in queries]
+
+
+def reciprocal_rank_fusion(rankings: List[List[SearchHit]], k: int = 60, top_k: int | None = None) -> List[SearchHit]:
+    """
+    RRF: score(d) = sum over rankings of 1 / (k + rank of d). Hits are matched by point id.
+    """
+    fused: Dict[Any, float] = {}
+    first: Dict[Any, SearchHit] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            fused[hit.id] = fused.get(hit.id, 0.0) + 1.0 / (k + rank)
+            first.setdefault(hit.id, hit)
+    order = sorted(fused, key=lambda pid: -fused[pid])
+    if top_k is not None:
+        order = order[:top_k]
+    return [SearchHit(id=pid, score=fused[pid], payload=first[pid].payload) for pid in order]
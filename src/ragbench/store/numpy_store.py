@@ -0,0 +1,191 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ragbench.store.base import SearchHit, payload_point_id
+
+DEFAULT_NUMPY_STORE_DIR = "data/vectors"
+
+class NumpyStore:
+    """
+    In-process exact-search store with QdrantStore semantics (COSINE, content-hash ids).
+    Vectors are kept L2-normalised in one contiguous float32 matrix; search is a
+    matmul + argpartition. Collections persist as .npy and are loaded with mmap.
+    Writes stay in memory (new rows in an append buffer, merged on the next search)
+    until flush(), so ingesting batch by batch does not rewrite the files per batch.
+    """
+    def __init__(self, collection_name: str, vector_size: int, data_dir: str = DEFAULT_NUMPY_STORE_DIR):
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.path = os.path.join(data_dir, collection_name)
+
+        self._matrix = np.zeros((0, vector_size), dtype=np.float32)
+        self._appended: List[np.ndarray] = []  # rows after _matrix, not yet concatenated
+        self._dirty = False
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._row_of: Dict[Any, int] = {}
+        if self.exists():
+            self._load()
+
+    def settings(self) -> Dict[str, Any]:
+        return {"backend": "numpy", "data_dir": os.path.dirname(self.path), "exact": True}
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "vectors.npy"))
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._appended:
+            self._matrix = np.concatenate([self._matrix, *self._appended])
+            self._appended = []
+        return self._matrix
+
+    def _load(self):
+        # read-only mmap; the first update of an existing row copies it into memory
+        self._matrix = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        if self._matrix.shape[1] != self.vector_size:
+            raise ValueError(
+                f"Collection '{self.collection_name}' has dim {self._matrix.shape[1]}, expected {self.vector_size}"
+            )
+        with open(os.path.join(self.path, "ids.json"), "r") as f:
+            self.ids = json.load(f)
+        with open(os.path.join(self.path, "payloads.jsonl"), "r") as f:
+            self.payloads = [json.loads(line) for line in f if line.strip()]
+        self._row_of = {pid: i for i, pid in enumerate(self.ids)}
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, "vectors.tmp.npy")
+        np.save(tmp, np.ascontiguousarray(self.vectors))
+        os.replace(tmp, os.path.join(self.path, "vectors.npy"))
+        with open(os.path.join(self.path, "ids.json"), "w") as f:
+            json.dump(self.ids, f)
+        with open(os.path.join(self.path, "payloads.jsonl"), "w") as f:
+            for p in self.payloads:
+                f.write(json.dumps(p, ensure_ascii=False) + "\n")
+        self._dirty = False
+
+    def flush(self):
+        """
+        Persists pending upserts/deletes; a no-op when nothing changed since the last save.
+        """
+        if self._dirty:
+            self.save()
+
+    def _reset(self):
+        self._matrix = np.zeros((0, self.vector_size), dtype=np.float32)
+        self._appended = []
+        self.ids, self.payloads, self._row_of = [], [], {}
+
+    def create_collection(self, recreate: bool = False):
+        if recreate and self.exists():
+            shutil.rmtree(self.path)
+            self._reset()
+
+        if self.exists():
+            print(f"Collection '{self.collection_name}' already exists.")
+            return
+
+        self._reset()
+        self.save()
+        print(f"Created collection '{self.collection_name}'.")
+
+    def recreate_collection(self):
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        self._reset()
+        self.save()
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return m / norms
+
+    def upsert(
+        self,
+        vectors: np.ndarray,
+        payloads: List[Dict[str, Any]],
+        batch_size: int | None = None,
+        ids: List[Any] | None = None,
+        wait: bool = True,
+    ):
+        # batch_size and wait are accepted for interface parity; everything is one in-memory write,
+        # persisted by flush()
+        assert len(vectors) == len(payloads), "vectors and payloads must align"
+        if len(vectors) == 0:
+            return
+
+        new = self._normalize(np.asarray(vectors, dtype=np.float32))
+        ids = list(ids) if ids is not None else [payload_point_id(p) for p in payloads]
+        assert len(ids) == len(payloads), "ids and payloads must align"
+
+        fresh, updated = [], []
+        for i, pid in enumerate(ids):
+            row = self._row_of.get(pid)
+            if row is None:
+                self._row_of[pid] = len(self.ids)
+                self.ids.append(pid)
+                self.payloads.append(payloads[i])
+                fresh.append(i)
+            else:
+                self.payloads[row] = payloads[i]
+                updated.append((i, row))
+        if fresh:
+            self._appended.append(new[fresh])
+        if updated:
+            # rewriting existing rows needs a writable matrix (copied out of the read-only mmap once)
+            matrix = self.vectors
+            if not matrix.flags.writeable:
+                self._matrix = matrix = np.array(matrix)
+            for i, row in updated:
+                matrix[row] = new[i]
+        self._dirty = True
+
+    def list_ids(self) -> List[Any]:
+        return list(self.ids)
+
+    def delete(self, ids: List[Any]):
+        drop = {self._row_of[pid] for pid in ids if pid in self._row_of}
+        if not drop:
+            return
+        keep = np.array([i for i in range(len(self.ids)) if i not in drop], dtype=np.int64)
+        vectors = np.ascontiguousarray(self.vectors[keep])
+        self.ids = [self.ids[i] for i in keep]
+        self.payloads = [self.payloads[i] for i in keep]
+        self._row_of = {pid: i for i, pid in enumerate(self.ids)}
+        self._matrix = vectors
+        self._dirty = True
+
+    def _hits(self, scores: np.ndarray, idx: np.ndarray) -> List[SearchHit]:
+        return [SearchHit(id=self.ids[i], score=float(scores[i]), payload=self.payloads[i]) for i in idx]
+
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        n = scores.shape[-1]
+        if top_k >= n:
+            return np.argsort(-scores, axis=-1)
+        part = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+        order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+        return np.take_along_axis(part, order, axis=-1)
+
+    def search(self, query_vector: np.ndarray, top_k: int = 3) -> List[SearchHit]:
+        if len(self.ids) == 0 or top_k <= 0:
+            return []
+        q = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self.vectors @ q
+        return self._hits(scores, self._top_k(scores, top_k))
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 3) -> List[List[SearchHit]]:
+        if len(query_vectors) == 0:
+            return []
+        if len(self.ids) == 0 or top_k <= 0:
+            return [[] for _ in query_vectors]
+        q = self._normalize(np.asarray(query_vectors, dtype=np.float32))
+        scores = q @ self.vectors.T
+        top = self._top_k(scores, top_k)
+        return [self._hits(s, idx) for s, idx in zip(scores, top)]
@@ -1,22 +1,96 @@
+from __future__ import annotations
 import os
-import uuid
-from typing import List, Dict, Any
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, List, Dict, Any
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import numpy as np
 from dotenv import load_dotenv
 
+from ragbench.store.base import payload_point_id
+
+if TYPE_CHECKING:
+    from qdrant_client.models import SearchParams
+
 load_dotenv()
 
+@dataclass(frozen=True)
+class QdrantOptions:
+    """
+    Connection, indexing and search knobs. None means "server default".
+    """
+    prefer_grpc: bool = False
+    # index build (create_collection / recreate_collection)
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    quantization: str | None = None  # "scalar" | "binary"
+    quantization_always_ram: bool = True
+    # upload
+    upload_parallel: int = 1
+    upload_batch_size: int = 128
+    # search
+    hnsw_ef: int | None = None
+    exact: bool = False
+    rescore: bool | None = None
+    oversampling: float | None = None
+
 class QdrantStore:
-    def __init__(self, collection_name: str, vector_size: int):
+    def __init__(self, collection_name: str, vector_size: int, options: QdrantOptions | None = None):
         self.collection_name = collection_name
         self.vector_size = vector_size
+        self.options = options or QdrantOptions()
+        # last point of the uploads not yet waited for; flush() re-upserts it with wait=True
+        self._barrier = None
 
+        if self.options.quantization not in (None, "scalar", "binary"):
+            raise ValueError("quantization must be None, 'scalar' or 'binary'")
+
+        # qdrant_client is imported on first use so that importing this module stays cheap
+        from qdrant_client import QdrantClient
         self.client = QdrantClient(
-            url=os.getenv("QDRANT_URL", "http://localhost:6333")
+            url=os.getenv("QDRANT_URL", "http://localhost:6333"),
+            prefer_grpc=self.options.prefer_grpc,
         )
 
+    def settings(self) -> Dict[str, Any]:
+        return {"backend": "qdrant", **asdict(self.options)}
+
+    def _collection_kwargs(self) -> Dict[str, Any]:
+        from qdrant_client.models import (
+            VectorParams,
+            Distance,
+            HnswConfigDiff,
+            ScalarQuantization,
+            ScalarQuantizationConfig,
+            ScalarType,
+            BinaryQuantization,
+            BinaryQuantizationConfig,
+        )
+        opts = self.options
+        kwargs: Dict[str, Any] = {
+            "vectors_config": VectorParams(size=self.vector_size, distance=Distance.COSINE),
+        }
+        if opts.hnsw_m is not None or opts.hnsw_ef_construct is not None:
+            kwargs["hnsw_config"] = HnswConfigDiff(m=opts.hnsw_m, ef_construct=opts.hnsw_ef_construct)
+        if opts.quantization == "scalar":
+            kwargs["quantization_config"] = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=opts.quantization_always_ram)
+            )
+        elif opts.quantization == "binary":
+            kwargs["quantization_config"] = BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=opts.quantization_always_ram)
+            )
+        return kwargs
+
+    def _search_params(self) -> SearchParams | None:
+        from qdrant_client.models import SearchParams, QuantizationSearchParams
+        opts = self.options
+        quant = None
+        if opts.rescore is not None or opts.oversampling is not None:
+            quant = QuantizationSearchParams(rescore=opts.rescore, oversampling=opts.oversampling)
+        if opts.hnsw_ef is None and not opts.exact and quant is None:
+            return None
+        return SearchParams(hnsw_ef=opts.hnsw_ef, exact=opts.exact, quantization=quant)
+
     def create_collection(self, recreate: bool = False):
         existing = {c.name for c in self.client.get_collections().collections}
 
@@ -31,7 +105,7 @@ class QdrantStore:
 
         self.client.create_collection(
             collection_name=self.collection_name,
-            vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE),
+            **self._collection_kwargs(),
         )
 
         # verify creation to avoid mysterious 404 later
@@ -41,29 +115,48 @@ class QdrantStore:
 
         print(f"Created collection '{self.collection_name}'.")
 
-    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]], batch_size: int = 128):
-
+    def upsert(
+        self,
+        vectors: np.ndarray,
+        payloads: List[Dict[str, Any]],
+        batch_size: int | None = None,
+        ids: List[Any] | None = None,
+        wait: bool = True,
+    ):
+        """
+        vectors: (n, dim) float32 array (lists are converted once).
+        ids default to content hashes of (payload doc_id, payload text), so re-upserting
+        an unchanged doc overwrites its point instead of duplicating it.
+        Points go through upload_collection in batches of batch_size (default
+        options.upload_batch_size), from options.upload_parallel workers. With wait=True
+        every batch is applied when this returns; with wait=False the batches are only
+        acknowledged, and flush() is the barrier.
+        """
+        from qdrant_client.models import PointStruct
+        vectors = np.asarray(vectors, dtype=np.float32)
         assert len(vectors) == len(payloads), "vectors and payloads must align"
 
         n = len(vectors)
-        for start in range(0, n, batch_size):
-            end = min(start + batch_size, n)
-
-            points = [
-                PointStruct(
-                    id=i,
-                    vector = vectors[i],
-                    payload = payloads[i],
-                    )
-                for i in range(start, end)
-            ]
-
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
+        if n == 0:
+            return
+        ids = list(ids) if ids is not None else [payload_point_id(p) for p in payloads]
+        assert len(ids) == n, "ids and vectors must align"
 
-    def search(self, query_vector: list[float], top_k: int = 3):
+        # upload_collection slices the array per batch itself and returns once all its workers are done
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=vectors,
+            payload=payloads,
+            ids=ids,
+            batch_size=batch_size or self.options.upload_batch_size,
+            parallel=self.options.upload_parallel,
+            wait=wait,
+        )
+        if not wait:
+            self._barrier = PointStruct(id=ids[-1], vector=vectors[-1].tolist(), payload=payloads[-1])
+
+    def search(self, query_vector: np.ndarray, top_k: int = 3):
+        query_vector = np.asarray(query_vector, dtype=np.float32)
         # Newer qdrant-client API
         if hasattr(self.client, "query_points"):
             res = self.client.query_points(
@@ -71,6 +164,7 @@ class QdrantStore:
                 query=query_vector,
                 limit=top_k,
                 with_payload=True,
+                search_params=self._search_params(),
             )
             # query_points returns an object with .points
             return res.points
@@ -81,9 +175,74 @@ class QdrantStore:
             query_vector=query_vector,
             limit=top_k,
             with_payload=True,
+            search_params=self._search_params(),
         )
-    
-    
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 3):
+        """
+        One round trip for many queries; returns a list of hit lists aligned with query_vectors.
+        """
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if len(query_vectors) == 0:
+            return []
+
+        # Newer qdrant-client API
+        if hasattr(self.client, "query_batch_points"):
+            from qdrant_client.models import QueryRequest
+            res = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    QueryRequest(query=qv.tolist(), limit=top_k, with_payload=True, params=self._search_params())
+                    for qv in query_vectors
+                ],
+            )
+            return [r.points for r in res]
+
+        # Older qdrant-client fallback API
+        from qdrant_client.models import SearchRequest
+        return self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                SearchRequest(vector=qv.tolist(), limit=top_k, with_payload=True, params=self._search_params())
+                for qv in query_vectors
+            ],
+        )
+
+
+    def list_ids(self) -> List[Any]:
+        ids, offset = [], None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=10_000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.extend(p.id for p in points)
+            if offset is None:
+                return ids
+
+    def delete(self, ids: List[Any], batch_size: int = 1000):
+        from qdrant_client.models import PointIdsList
+        for start in range(0, len(ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(ids[start:start + batch_size])),
+                wait=True,
+            )
+
+    def flush(self):
+        """
+        Waits until every upsert made with wait=False is applied. All of them were
+        acknowledged (in the WAL) before this call, and a collection applies its WAL
+        in order, so a wait=True re-upsert of the last uploaded point returns only after
+        they are. Deletes always wait.
+        """
+        if self._barrier is None:
+            return
+        self.client.upsert(collection_name=self.collection_name, points=[self._barrier], wait=True)
+        self._barrier = None
 
     def recreate_collection(self):
         # Delete if exists (ignore if it doesn't)
@@ -95,10 +254,7 @@ class QdrantStore:
         # Create fresh
         self.client.create_collection(
             collection_name=self.collection_name,
-            vectors_config=VectorParams(
-                size=self.vector_size,
-                distance=Distance.COSINE,
-            ),
+            **self._collection_kwargs(),
         )
 
 
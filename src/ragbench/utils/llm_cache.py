@@ -0,0 +1,120 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ragbench.eval.pricing import MODEL_PRICING, estimate_cost
+
+DEFAULT_LLM_CACHE_PATH = ".cache/llm_responses.sqlite"
+
+def context_hash(context_chunks: List[str]) -> str:
+    h = hashlib.sha256()
+    for c in context_chunks:
+        h.update(c.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent cache for temperature=0 chat completions (answers and judge verdicts).
+    Keyed by (kind, model, system prompt, question, context hash[, answer]).
+    Entries expire after ttl_s and the table is capped at max_entries (LRU).
+    With bypass=True lookups always miss, but fresh responses are still stored.
+    """
+    def __init__(
+        self,
+        path: str = DEFAULT_LLM_CACHE_PATH,
+        ttl_s: Optional[float] = None,
+        max_entries: int = 100_000,
+        bypass: bool = False,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.bypass = bypass
+
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.usd_saved = 0.0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, model TEXT NOT NULL, "
+            "value TEXT NOT NULL, usage TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(kind: str, model: str, system: str, question: str, context_chunks: List[str], answer: str | None = None) -> str:
+        raw = json.dumps([kind, model, system, question, context_hash(context_chunks), answer])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        if self.bypass:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT model, value, usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is not None and self.ttl_s is not None and now - row[3] > self.ttl_s:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+
+        model, value, usage = row[0], json.loads(row[1]), json.loads(row[2])
+        self.hits += 1
+        self.tokens_saved += usage.get("total_tokens", 0)
+        if model in MODEL_PRICING:
+            self.usd_saved += estimate_cost(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        return value, usage
+
+    def put(self, key: str, kind: str, model: str, value: Any, usage: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, model, value, usage, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, model, json.dumps(value), json.dumps(usage), now, now),
+            )
+            n = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if n > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (n - self.max_entries,),
+                )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "usd_saved": round(self.usd_saved, 6),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
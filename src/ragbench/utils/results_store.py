@@ -0,0 +1,257 @@
+from __future__ import annotations
+import json
+import os
+import secrets
+import shutil
+import types
+import typing
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence
+
+from pydantic import BaseModel
+
+from ragbench.store.base import point_id
+from ragbench.utils.run_schema import RetrievedChunk, RunRecord, Timing
+
+DEFAULT_RESULTS_DIR = "results/store"
+
+# per-item evaluation columns stored next to the RunRecord fields
+EVAL_COLUMNS = {
+    "item_id": "string",
+    "variant": "string",  # configuration within a multi-config run (generator, retrieval config); None otherwise
+    "gold_answer": "string",
+    "answer": "string",
+    "faithful": "bool",
+    "refused": "bool",
+    "judge": "string",  # verdict JSON
+    "answer_tokens": "int64",
+    "judge_tokens": "int64",
+}
+
+# RagPipeline record fields outside RunRecord that the threshold and gate analyses need
+RETRIEVAL_COLUMNS = {
+    "retrieval_mode": "string",
+    "rerank_backend": "string",
+    "top_dense_score": "double",
+    "top_rerank_score": "double",
+    "rerank_decision": "string",  # JSON
+    "cascade": "string",  # JSON
+    "store": "string",  # JSON store settings
+}
+
+def chunk_id(chunk: RetrievedChunk) -> str:
+    # same identity as vector store points: (doc id, text)
+    return point_id(chunk.payload.get("doc_id"), chunk.text)
+
+def retrieval_columns(retr: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    RETRIEVAL_COLUMNS values of a RagPipeline.run() record, to pass along with the eval columns.
+    """
+    return {k: retr.get(k) for k in RETRIEVAL_COLUMNS}
+
+def run_record_from_retrieval(retr: Dict[str, Any]) -> RunRecord:
+    """
+    RunRecord from a RagPipeline.run() record. Reranked results are the context chunks,
+    with payloads looked up in the dense results (the cross-encoder score is not kept per chunk).
+    """
+    t = retr["timings_ms"]
+    dense = [RetrievedChunk(text=d["text"], payload=d["payload"], score=d["score"]) for d in retr["dense_results"]]
+    by_text = {c.text: c for c in dense}
+    reranked = []
+    if retr.get("use_rerank"):
+        reranked = [RetrievedChunk(text=text, payload=by_text[text].payload if text in by_text else {})
+                    for text in retr["context_chunks"]]
+    return RunRecord(
+        query=retr["question"],
+        dense_top_k=retr["dense_top_k"],
+        rerank_top_n=retr["rerank_top_n"],
+        embedding_model=retr["embed_model"],
+        reranker_model=retr.get("rerank_model"),
+        timings=Timing(
+            embed_query_ms=t["embed_query"],
+            retrieve_ms=t["retrieve"],
+            rerank_ms=t["rerank"],
+            total_ms=t["total_retrieval"],
+        ),
+        dense_results=dense,
+        reranked_results=reranked,
+    )
+
+
+def arrow_type(annotation):
+    """
+    Arrow type for a pydantic field annotation. Nested models become structs, dicts are
+    stored as JSON strings, and RetrievedChunk lists hold (chunk_id, score) references
+    into the chunks table instead of the text.
+    """
+    import pyarrow as pa
+
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        (inner,) = [a for a in args if a is not type(None)]
+        return arrow_type(inner)
+    if origin in (list, List):
+        if args[0] is RetrievedChunk:
+            return pa.list_(pa.struct([("chunk_id", pa.string()), ("score", pa.float64())]))
+        return pa.list_(arrow_type(args[0]))
+    if origin in (dict, Dict) or annotation is dict:
+        return pa.string()
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return pa.struct([(name, arrow_type(f.annotation)) for name, f in annotation.model_fields.items()])
+    scalars = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+    if annotation in scalars:
+        return scalars[annotation]
+    raise TypeError(f"No arrow type for {annotation!r}")
+
+def item_schema():
+    """
+    Item table schema: eval and retrieval columns plus the RunRecord fields. run_id is the partition key.
+    """
+    import pyarrow as pa
+    fields = [(name, pa.type_for_alias(alias)) for name, alias in {**EVAL_COLUMNS, **RETRIEVAL_COLUMNS}.items()]
+    fields += [(name, arrow_type(f.annotation)) for name, f in RunRecord.model_fields.items()]
+    return pa.schema(fields)
+
+
+class ResultsStore:
+    """
+    Benchmark results as hive-partitioned Parquet under root:
+      items/run_id=<id>/part-*.parquet   one row per item (RunRecord + eval columns)
+      chunks/part-*.parquet              chunk_id, text, payload JSON; each chunk stored once
+      runs/run_id=<id>/meta.parquet      created, script, config JSON
+    Every write is a new part file renamed into place, so appends are atomic and readers never
+    see half-written files. Queries go through pyarrow.dataset, so filters on partition and
+    column values are pushed down to file and row-group pruning.
+    """
+    def __init__(self, root: str = DEFAULT_RESULTS_DIR):
+        self.root = root
+        self._known_chunks: set | None = None
+
+    @staticmethod
+    def new_run_id(prefix: str = "run") -> str:
+        return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
+
+    def _write(self, table, directory: str, name: str | None = None) -> str:
+        import pyarrow.parquet as pq
+        os.makedirs(directory, exist_ok=True)
+        name = name or f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{secrets.token_hex(4)}.parquet"
+        path = os.path.join(directory, name)
+        tmp = os.path.join(directory, f".{name}.tmp")  # dot files are skipped by dataset discovery
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        return path
+
+    def _dataset(self, name: str, schema=None):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return None
+        partitioning = ds.partitioning(pa.schema([("run_id", pa.string())]), flavor="hive")
+        return ds.dataset(path, format="parquet", partitioning=partitioning, schema=schema, exclude_invalid_files=True)
+
+    def write_run_meta(self, run_id: str, config: Dict[str, Any] | None = None, script: str | None = None) -> str:
+        import pyarrow as pa
+        table = pa.table({
+            "created": [datetime.now().isoformat(timespec="seconds")],
+            "script": [script],
+            "config": [json.dumps(config or {}, default=str, sort_keys=True)],
+        })
+        return self._write(table, os.path.join(self.root, "runs", f"run_id={run_id}"), "meta.parquet")
+
+    def drop_run(self, run_id: str):
+        """
+        Removes a run's items and meta (chunks are shared and kept), e.g. before rewriting
+        a run whose previous write may or may not have completed.
+        """
+        for table in ("items", "runs"):
+            shutil.rmtree(os.path.join(self.root, table, f"run_id={run_id}"), ignore_errors=True)
+
+    def write_run(
+        self,
+        run_id: str,
+        records: Sequence[RunRecord],
+        evals: Sequence[Dict[str, Any]] | None = None,
+        config: Dict[str, Any] | None = None,
+        script: str | None = None,
+    ) -> str:
+        """
+        A whole run in one go: replaces whatever an earlier (possibly interrupted) write
+        of run_id left, then writes its meta and items.
+        """
+        self.drop_run(run_id)
+        self.write_run_meta(run_id, config=config, script=script)
+        return self.append(run_id, records, evals)
+
+    def _store_chunks(self, chunks: Iterable[RetrievedChunk]):
+        import pyarrow as pa
+        if self._known_chunks is None:
+            existing = self._dataset("chunks")
+            self._known_chunks = (
+                set(existing.to_table(columns=["chunk_id"]).column("chunk_id").to_pylist()) if existing else set()
+            )
+        new: Dict[str, RetrievedChunk] = {}
+        for c in chunks:
+            cid = chunk_id(c)
+            if cid not in self._known_chunks and cid not in new:
+                new[cid] = c
+        if not new:
+            return
+        table = pa.table({
+            "chunk_id": list(new),
+            "text": [c.text for c in new.values()],
+            "payload": [json.dumps({k: v for k, v in c.payload.items() if k != "text"}, default=str) for c in new.values()],
+        })
+        self._write(table, os.path.join(self.root, "chunks"))
+        self._known_chunks.update(new)
+
+    def append(self, run_id: str, records: Sequence[RunRecord], evals: Sequence[Dict[str, Any]] | None = None) -> str:
+        """
+        Appends items to a run as one new part file. evals holds EVAL_COLUMNS (and optionally
+        RETRIEVAL_COLUMNS) values per record; dict values of string columns are stored as JSON.
+        """
+        import pyarrow as pa
+        evals = evals or [{} for _ in records]
+        assert len(evals) == len(records), "records and evals must align"
+
+        self._store_chunks(c for r in records for c in (*r.dense_results, *r.reranked_results))
+        rows = []
+        for record, ev in zip(records, evals):
+            row = {k: ev.get(k) for k in (*EVAL_COLUMNS, *RETRIEVAL_COLUMNS)}
+            for k in ("judge", "rerank_decision", "cascade", "store"):
+                if isinstance(row[k], (dict, list)):
+                    row[k] = json.dumps(row[k], default=str)
+            row.update(record.model_dump(exclude={"dense_results", "reranked_results"}))
+            for key in ("dense_results", "reranked_results"):
+                row[key] = [{"chunk_id": chunk_id(c), "score": c.score} for c in getattr(record, key)]
+            rows.append(row)
+        table = pa.Table.from_pylist(rows, schema=item_schema())
+        return self._write(table, os.path.join(self.root, "items", f"run_id={run_id}"))
+
+    def scan(self, columns: List[str] | None = None, filter=None):
+        """
+        Items as a pyarrow Table, reading only the requested columns and the files/row groups
+        that can match filter, e.g. (ds.field("run_id") == rid) & (ds.field("timings", "total_ms") > 500).
+        """
+        import pyarrow as pa
+        schema = pa.unify_schemas([item_schema(), pa.schema([("run_id", pa.string())])])
+        items = self._dataset("items", schema=schema)
+        if items is None:
+            return schema.empty_table() if columns is None else schema.empty_table().select(columns)
+        return items.to_table(columns=columns, filter=filter)
+
+    def runs(self, filter=None):
+        runs = self._dataset("runs")
+        if runs is None:
+            import pyarrow as pa
+            return pa.table({"run_id": [], "created": [], "script": [], "config": []})
+        return runs.to_table(filter=filter).sort_by("created")
+
+    def chunk_texts(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        import pyarrow.dataset as ds
+        chunks = self._dataset("chunks")
+        ids = list(set(chunk_ids))
+        if chunks is None or not ids:
+            return {}
+        table = chunks.to_table(columns=["chunk_id", "text"], filter=ds.field("chunk_id").isin(ids))
+        return dict(zip(table.column("chunk_id").to_pylist(), table.column("text").to_pylist()))
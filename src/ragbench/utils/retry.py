@@ -0,0 +1,49 @@
+import asyncio
+import functools
+import time
+from typing import Awaitable, Callable, Tuple, Type, TypeVar
+
+from ragbench.utils.tracing import TRACER
+
+T = TypeVar("T")
+
+@functools.cache
+def retryable_errors() -> Tuple[Type[BaseException], ...]:
+    # resolved on first use, so importing this module doesn't pull in the openai SDK
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+
+DEFAULT_MAX_RETRIES = 5
+
+def backoff_s(attempt: int) -> float:
+    return min(2 ** attempt, 30)
+
+def call_with_retries(fn: Callable[[], T], stage: str, max_retries: int = DEFAULT_MAX_RETRIES) -> T:
+    """
+    Calls fn, retrying transient OpenAI errors with exponential backoff.
+    Each backoff wait is recorded as a "retry" span, so retries show up in traces.
+    Use with clients created with max_retries=0, otherwise the SDK retries silently first.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except retryable_errors() as e:
+            if attempt == max_retries:
+                raise
+            with TRACER.span("retry", stage=stage, attempt=attempt + 1, error=type(e).__name__):
+                time.sleep(backoff_s(attempt))
+
+async def acall_with_retries(fn: Callable[[], Awaitable[T]], stage: str, max_retries: int = DEFAULT_MAX_RETRIES) -> T:
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except retryable_errors() as e:
+            if attempt == max_retries:
+                raise
+            with TRACER.span("retry", stage=stage, attempt=attempt + 1, error=type(e).__name__):
+                await asyncio.sleep(backoff_s(attempt))
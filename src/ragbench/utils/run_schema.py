@@ -7,10 +7,11 @@ class RetrievedChunk(BaseModel):
     score: Optional[float] = None
 
 class Timing(BaseModel):
-    embed_query_ms: int
-    retrieve_ms: int
-    rerank_ms: int = 0
-    total_ms: int
+    # float: per-item shares of batch stages are often well under 1 ms
+    embed_query_ms: float
+    retrieve_ms: float
+    rerank_ms: float = 0.0
+    total_ms: float
 
 class RunRecord(BaseModel):
     query: str
@@ -0,0 +1,199 @@
+from __future__ import annotations
+import contextvars
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+SERVICE_NAME = "ragbench"
+PERCENTILES = (50, 90, 99)
+# stages reported in summary CSVs; "retry" spans cover provider backoff waits
+STAGES = ("embed_query", "retrieve", "rerank", "generate", "judge", "retry")
+# spans kept in memory (a few hundred bytes each); older ones are dropped first
+MAX_SPANS = 200_000
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_unix_ns: int
+    duration_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def per_item_ms(self) -> float:
+        # batch spans cover batch_size items; per-item latency is the even share
+        return self.duration_ns / 1e6 / max(int(self.attributes.get("batch_size", 1)), 1)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("ragbench_span", default=None)
+
+
+class Tracer:
+    """
+    In-process span recorder. Durations come from perf_counter_ns, start times from
+    time_ns (for export). Parent/child links follow contextvars, so they survive
+    asyncio tasks; spans opened in worker threads start new traces.
+    Only the last max_spans spans are kept, so long runs (load tests) stay bounded;
+    dropped counts the evicted ones. Scripts reset() between phases.
+    """
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self.dropped = 0
+        self._recorded = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.dropped = 0
+
+    def mark(self) -> int:
+        """
+        Position to pass to since() to get only the spans recorded after this point.
+        """
+        return self._recorded
+
+    def since(self, mark: int) -> List[Span]:
+        # spans evicted since the mark are gone; the rest are the newest ones kept
+        with self._lock:
+            n = min(self._recorded - mark, len(self.spans))
+            return list(itertools.islice(self.spans, len(self.spans) - n, None)) if n > 0 else []
+
+    def _append(self, s: Span):
+        if len(self.spans) == self.spans.maxlen:
+            self.dropped += 1
+        self.spans.append(s)
+        self._recorded += 1
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        parent = _current.get()
+        s = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_unix_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = _current.set(s)
+        t0 = time.perf_counter_ns()
+        try:
+            yield s
+        except BaseException as e:
+            s.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            s.duration_ns = time.perf_counter_ns() - t0
+            _current.reset(token)
+            with self._lock:
+                self._append(s)
+
+    def export_otlp_json(self, path: str, spans: Sequence[Span] | None = None) -> str:
+        """
+        Writes spans as an OTLP/JSON ExportTraceServiceRequest, loadable without a live collector.
+        """
+        spans = self.spans if spans is None else spans
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        doc = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": SERVICE_NAME},
+                    "spans": [_otlp_span(s) for s in spans],
+                }],
+            }]
+        }
+        with open(path, "w") as f:
+            json.dump(doc, f)
+        return path
+
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        v = {"boolValue": value}
+    elif isinstance(value, int):
+        v = {"intValue": str(value)}
+    elif isinstance(value, float):
+        v = {"doubleValue": value}
+    else:
+        v = {"stringValue": str(value)}
+    return {"key": key, "value": v}
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    out = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(s.start_unix_ns),
+        "endTimeUnixNano": str(s.start_unix_ns + s.duration_ns),
+        "attributes": [_otlp_attr(k, v) for k, v in s.attributes.items() if v is not None],
+        "status": {"code": 2} if "error" in s.attributes else {},
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+def stage_percentiles(spans: Sequence[Span], stages: Sequence[str] | None = None) -> Dict[str, Dict[str, float]]:
+    """
+    {stage: {count, cached, p50, p90, p99, max}} in per-item milliseconds.
+    Spans served from a cache (cached=True, e.g. LLM cache hits) are counted in
+    "cached" but left out of count and the percentiles, which would otherwise be
+    dominated by ~0 ms hits. Stages with only cached spans have no percentiles.
+    """
+    by_stage: Dict[str, List[float]] = {}
+    cached: Dict[str, int] = {}
+    for s in spans:
+        if stages is None or s.name in stages:
+            values = by_stage.setdefault(s.name, [])
+            if s.attributes.get("cached"):
+                cached[s.name] = cached.get(s.name, 0) + 1
+            else:
+                values.append(s.per_item_ms)
+
+    out = {}
+    for name, values in by_stage.items():
+        arr = np.asarray(values, dtype=np.float64)
+        row = {"count": len(arr), "cached": cached.get(name, 0)}
+        if len(arr):
+            for p, v in zip(PERCENTILES, np.percentile(arr, PERCENTILES)):
+                row[f"p{p}"] = float(v)
+            row["max"] = float(arr.max())
+        out[name] = row
+    return out
+
+def latency_columns(spans: Sequence[Span], stages: Sequence[str] | None = STAGES) -> Dict[str, float]:
+    """
+    Flat {stage_p50_ms: ...} columns for summary CSV rows (uncached spans only),
+    plus {stage_cached: n} for stages that had cache hits.
+    """
+    cols = {}
+    for name, row in stage_percentiles(spans, stages).items():
+        for k in [f"p{p}" for p in PERCENTILES] + ["max"]:
+            if k in row:
+                cols[f"{name}_{k}_ms"] = round(row[k], 3)
+        if row["cached"]:
+            cols[f"{name}_cached"] = row["cached"]
+    return cols
+
+
+# process-wide tracer used by the pipeline, providers and scripts
+TRACER = Tracer()
+
+def get_tracer() -> Tracer:
+    return TRACER
@@ -1,11 +1,12 @@
 import os
-import uuid
 from typing import List, Dict, Any
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance
 from dotenv import load_dotenv
 
+from ragbench.store.base import payload_point_id
+
 load_dotenv()
 
 class QdrantStore:
@@ -41,7 +42,7 @@ class QdrantStore:
         for vector, payload in zip(vectors, payloads):
             points.append(
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": payload_point_id(payload),
                     "vector": vector,
                     "payload": payload,
                 }